@@ -0,0 +1,306 @@
+# End-to-end benchmark: builds decks from fixtures with every request answered locally, so numbers are
+# repeatable and need no network or API key. Page and image requests go through the builder's own session to
+# a local fixture server, and OpenAI calls go to a fake server with a fixed latency. Each fixture runs in a
+# fresh process so its peak RSS is its own.
+#
+#   python benchmarks/bench.py                      # small, medium and huge against baseline.json
+#   python benchmarks/bench.py medium Apollo_11     # chosen fixtures (recorded ones by folder name)
+#   python benchmarks/bench.py --update-baseline    # accept the current numbers
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import quote, unquote, urlsplit
+
+from pptx import Presentation
+
+import corpus
+import fakeopenai
+
+baselinePath = os.path.join(corpus.here, 'baseline.json')
+launcher = os.path.join(corpus.root, 'Powerpoint creator.py')
+contentTypes = {'.html': 'text/html; charset=utf-8', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png',
+                '.gif': 'image/gif', '.svg': 'image/svg+xml', '.webp': 'image/webp'}
+checkedStages = ['deck', 'page.fetch', 'page.parse', 'section.parse', 'image.fetch', 'image.normalise',
+                 'llm.bullets', 'llm.caption', 'slide.build', 'deck.save']
+slack = 0.01 # seconds a stage may move before tolerance applies, so millisecond noise isn't a regression
+
+#---------------FIXTURE SERVER----------------
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True # headers and body go out in separate writes, which Nagle would hold for a delayed ACK
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.server.files.get(unquote(urlsplit(self.path).query[len('url='):]))
+        if path is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        time.sleep(self.server.latency)
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', contentTypes.get(os.path.splitext(path)[1].lower(), 'application/octet-stream'))
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def serveFixtures(files, latency):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    server.daemon_threads = True
+    server.files = files
+    server.latency = latency
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def fixtureSession(pipeline, fixtureUrl):
+    # the pipeline's own session, with every request rerouted to the fixture server
+    from requests.adapters import HTTPAdapter
+
+    class FixtureAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            request.url = f"{fixtureUrl}/get?url={quote(request.url, safe='')}"
+            return super().send(request, **kwargs)
+
+    session = pipeline.makeSession()
+    adapter = FixtureAdapter(pool_connections=16, pool_maxsize=pipeline.imageWorkers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+#---------------WORKER----------------
+
+def peakRssMb():
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024*1024 if sys.platform == 'darwin' else 1024), 1)
+
+def runFixture(name, args):
+    # runs inside a fresh process: warm up, then build args.reps decks and measure them
+    os.environ['PRESENT_AI_CACHE'] = 'off'
+    os.environ['PRESENT_AI_ASSETS'] = 'off'
+    # the scheduler is told the fake server's limits, as it would be the real one's (it has no tokens limit)
+    os.environ['PRESENT_AI_RPM'] = str(args.ai_rpm)
+    os.environ['PRESENT_AI_TPM'] = '0'
+    start = time.perf_counter()
+    pipeline = corpus.loadPipeline()
+    for module in ('builder', 'scraping', 'images', 'slides', 'layout', 'summarisers'):
+        importlib.import_module(f'present_ai.{module}')
+    importSeconds = time.perf_counter() - start
+
+    pageUrl, topic, files = corpus.load(name)
+    fixtures = serveFixtures(files, args.net_latency)
+    if args.summariser == 'openai':
+        from openai import OpenAI
+        summariser = pipeline.OpenAISummariser(ai=OpenAI(api_key='bench', base_url=args.ai_url, max_retries=0))
+    else:
+        summariser = pipeline.makeSummariser(args.summariser)
+
+    durations = {}
+    slides = 0
+    with tempfile.TemporaryDirectory(prefix='present-ai-bench-') as outputDir:
+        # fixtures are rendered pages, so they are read the way HtmlFetcher reads them
+        session = fixtureSession(pipeline, fixtures.url)
+        builder = pipeline.DeckBuilder(session=session, summariser=summariser, outputDir=outputDir, verbose=False,
+                                       fetcher=pipeline.HtmlFetcher(session))
+        for rep in range(args.warmup):
+            builder.build(pageUrl, f'{topic} warmup {rep}')
+
+        start = time.perf_counter()
+        for rep in range(args.reps):
+            report = pipeline.RunReport()
+            path = builder.build(pageUrl, f'{topic} {rep}', report)
+            for stage, _, duration, _, _ in report.events:
+                durations.setdefault(stage, []).append(duration)
+        seconds = time.perf_counter() - start
+        slides = len(Presentation(path).slides)
+
+    stages = {}
+    for stage, values in durations.items():
+        values.sort()
+        stages[stage] = {'count': len(values), 'p50': round(pipeline.percentile(values, 50), 4),
+                         'p95': round(pipeline.percentile(values, 95), 4)}
+    return {'decks': args.reps, 'slides': slides, 'seconds': round(seconds, 2),
+            'decksPerMin': round(args.reps / seconds * 60, 2), 'peakRssMb': peakRssMb(),
+            'importSeconds': round(importSeconds, 3), 'stages': stages}
+
+#---------------STARTUP----------------
+
+def importTimes(*command):
+    # microseconds per top level import when running command, from -X importtime
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', *command], stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True, cwd=corpus.root).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and line.count('|') == 2:
+            self, cumulative, name = line[len('import time:'):].split('|')
+            if name.startswith(' ') and not name.startswith('  ') and cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+def measureStartup(runs=5):
+    # best of a few runs, counting only what a bare interpreter doesn't import on its own
+    bare = set(importTimes('-c', 'pass'))
+    def importMs(*command):
+        return min(sum(us for name, us in importTimes(*command).items() if name not in bare) for _ in range(runs)) / 1000
+    helpMs = importMs(launcher, '--help')
+    buildMs = importMs('-c', 'import present_ai.builder, present_ai.scraping, present_ai.images, present_ai.slides')
+    walls = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, launcher, '--help'], stdout=subprocess.DEVNULL, cwd=corpus.root)
+        walls.append(time.perf_counter() - start)
+    return {'helpImportMs': round(helpMs, 1), 'buildImportMs': round(buildMs, 1), 'helpSeconds': round(min(walls), 3)}
+
+#---------------COMPARISON----------------
+
+def compare(name, result, baseline, tolerance):
+    # returns a line per regression against the baseline numbers for this fixture
+    problems = []
+    if result['decksPerMin'] < baseline['decksPerMin'] * (1-tolerance):
+        problems.append(f"{name}: throughput {result['decksPerMin']} decks/min, baseline {baseline['decksPerMin']}")
+    if result['peakRssMb'] and baseline.get('peakRssMb') and result['peakRssMb'] > baseline['peakRssMb'] * (1+tolerance):
+        problems.append(f"{name}: peak RSS {result['peakRssMb']} MB, baseline {baseline['peakRssMb']} MB")
+    deck, deckThen = result['stages'].get('deck'), baseline['stages'].get('deck')
+    if deck and deckThen and deck['p95'] > deckThen['p95'] * (1+tolerance) + slack:
+        problems.append(f"{name}: deck p95 {deck['p95']:.2f} s, baseline {deckThen['p95']:.2f} s")
+    # inner stages are gated on their median, their p95 over a few decks is mostly scheduling noise
+    for stage in checkedStages[1:]:
+        now, then = result['stages'].get(stage), baseline['stages'].get(stage)
+        if now and then and now['p50'] > then['p50'] * (1+tolerance) + slack:
+            problems.append(f"{name}: {stage} p50 {now['p50']*1000:.0f} ms, baseline {then['p50']*1000:.0f} ms")
+    return problems
+
+def compareStartup(startup, baseline, tolerance, budget):
+    problems = []
+    if startup['helpImportMs'] > budget:
+        problems.append(f"startup: --help spends {startup['helpImportMs']} ms importing, budget {budget} ms")
+    for field in ('helpImportMs', 'buildImportMs'):
+        if baseline and startup[field] > baseline[field] * (1+tolerance) + slack*1000:
+            problems.append(f"startup: {field} {startup[field]} ms, baseline {baseline[field]} ms")
+    return problems
+
+def printResults(results):
+    print(f"\n{'fixture':<14}{'decks/min':>10}{'slides':>8}{'peak MB':>9}{'import s':>10}{'429s':>6}   deck p50/p95 s")
+    for name, result in results.items():
+        deck = result['stages'].get('deck', {'p50': 0, 'p95': 0})
+        print(f"{name:<14}{result['decksPerMin']:>10}{result['slides']:>8}{str(result['peakRssMb']):>9}"
+              f"{result['importSeconds']:>10}{result.get('ai429s', 0):>6}   {deck['p50']:.2f} / {deck['p95']:.2f}")
+
+    print(f"\n{'stage p50/p95 ms':<18}" + ''.join(f'{name:>18}' for name in results))
+    for stage in checkedStages:
+        cells = []
+        for result in results.values():
+            values = result['stages'].get(stage)
+            cells.append(f"{values['p50']*1000:.0f} / {values['p95']*1000:.0f}" if values else '-')
+        print(f'{stage:<18}' + ''.join(f'{cell:>18}' for cell in cells))
+
+def settings(args):
+    # the knobs that change the numbers; a baseline only compares against runs with the same ones
+    knobs = {'summariser': args.summariser, 'aiLatency': args.ai_latency, 'netLatency': args.net_latency,
+             'warmup': args.warmup}
+    if args.ai_rpm:
+        knobs['aiRpm'] = args.ai_rpm
+    return knobs
+
+#-------------------------------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark deck building against recorded and synthetic fixtures.')
+    parser.add_argument('fixtures', nargs='*', help=f"fixture names (default: {' '.join(corpus.sizes)})")
+    parser.add_argument('--reps', type=int, default=3, help='measured decks per fixture')
+    parser.add_argument('--warmup', type=int, default=1, help='unmeasured decks built first per fixture')
+    parser.add_argument('--summariser', choices=['openai', 'local'], default='openai')
+    parser.add_argument('--ai-latency', type=float, default=0.2, help='seconds the fake OpenAI server takes per completion')
+    parser.add_argument('--ai-rate-limited', type=float, default=0.0, help='share of completions answered with 429')
+    parser.add_argument('--ai-rpm', type=float, default=0, help='requests per minute the fake OpenAI server allows before 429s (0 for no limit)')
+    parser.add_argument('--net-latency', type=float, default=0.02, help='seconds the fixture server takes per request')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown or growth before a regression fails')
+    parser.add_argument('--import-budget-ms', type=float, default=25, help='most --help may spend importing, beyond what a bare interpreter imports')
+    parser.add_argument('--baseline', default=baselinePath)
+    parser.add_argument('--update-baseline', action='store_true', help='write these results as the new baseline')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--ai-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(runFixture(args.worker, args), sys.stdout)
+        sys.exit(0)
+
+    names = args.fixtures or list(corpus.sizes)
+    for name in names:
+        corpus.fixtureFolder(name) # generate or fail before anything is timed
+    aiServer = fakeopenai.serve(args.ai_latency, args.ai_rate_limited, rpm=args.ai_rpm)
+
+    results = {}
+    for name in names:
+        print(f"Benchmarking {name} ({args.warmup} warmup + {args.reps} decks)...", flush=True)
+        command = [sys.executable, os.path.abspath(__file__), '--worker', name, '--ai-url', aiServer.url,
+                   '--reps', str(args.reps), '--warmup', str(args.warmup), '--summariser', args.summariser,
+                   '--net-latency', str(args.net_latency), '--ai-rpm', str(args.ai_rpm)]
+        limitedBefore = aiServer.limited
+        worker = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+        if worker.returncode:
+            sys.exit(f"{name}: benchmark worker failed with exit code {worker.returncode}")
+        results[name] = json.loads(worker.stdout.strip().splitlines()[-1])
+        results[name]['ai429s'] = aiServer.limited - limitedBefore
+    printResults(results)
+    startup = measureStartup()
+    print(f"\nstartup: --help {startup['helpSeconds']} s, importing {startup['helpImportMs']} ms for --help and "
+          f"{startup['buildImportMs']} ms for a build")
+
+    run = {'settings': settings(args), 'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+           'cpus': os.cpu_count()}, 'startup': startup, 'fixtures': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {'settings': run['settings'], 'machine': run['machine'], 'startup': startup, 'fixtures': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline['fixtures'] = json.load(f).get('fixtures', {})
+        baseline['fixtures'].update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline updated: {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        sys.exit(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one")
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['settings'] != run['settings']:
+        sys.exit(f"\nBaseline was recorded with {baseline['settings']}, this run used {run['settings']}; not comparable")
+
+    problems = compareStartup(startup, baseline.get('startup'), args.tolerance, args.import_budget_ms)
+    for name, result in results.items():
+        if name in baseline['fixtures']:
+            problems += compare(name, result, baseline['fixtures'][name], args.tolerance)
+        else:
+            print(f"{name}: no baseline yet")
+    if problems:
+        print(f"\n{'!'*60}\nPERFORMANCE REGRESSION (tolerance {args.tolerance:.0%})")
+        for problem in problems:
+            print('  ' + problem)
+        print('!'*60)
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
@@ -0,0 +1,141 @@
+# Benchmark fixtures. A fixture is a folder holding page.html, the images it links to under files/ and a
+# manifest.json of {'url', 'topic', 'files': {original url: file}}. Recorded Wikipedia articles live in
+# benchmarks/fixtures (see record.py); the synthetic small/medium/huge corpus is generated on first use
+# into benchmarks/.generated, deterministically, so runs on different machines see the same bytes.
+
+import io
+import json
+import os
+import random
+import sys
+
+from PIL import Image
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.dirname(here)
+recordedDir = os.path.join(here, 'fixtures')
+generatedDir = os.path.join(here, '.generated')
+
+corpusVersion = 1 # bump when the generator changes so stale generated fixtures are rebuilt
+
+# sections, paragraphs per section, long sections (chunked summaries), distinct images, image figures per section
+sizes = {
+    'small':  {'sections': 6,  'paragraphs': 3, 'longSections': 0, 'images': 8,   'figures': 2},
+    'medium': {'sections': 20, 'paragraphs': 5, 'longSections': 2, 'images': 40,  'figures': 3},
+    'huge':   {'sections': 60, 'paragraphs': 7, 'longSections': 6, 'images': 120, 'figures': 4},
+}
+
+words = '''airship hydrogen engine crew passenger voyage harbour storm signal tower station empire treaty river
+valley mountain railway factory harvest council election charter bridge canal cathedral garrison province
+dynasty merchant fleet colony frontier census reform protest strike museum archive manuscript telescope
+orbit comet eclipse glacier volcano delta lagoon reef forest meadow desert plateau canyon island peninsula
+experiment theory molecule protein enzyme reactor turbine circuit satellite antenna compiler network'''.split()
+
+def loadPipeline():
+    # the present_ai package from this checkout, whatever is installed
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    import present_ai
+    return present_ai
+
+def sentence(rand):
+    text = ' '.join(rand.choice(words) for _ in range(rand.randint(8, 24)))
+    return text[0].upper() + text[1:] + '.'
+
+def paragraph(rand, sentences):
+    text = ' '.join(sentence(rand) for _ in range(sentences))
+    return f'<p>{text}<sup class="reference"><a href="#cite_note-{rand.randint(1, 40)}">[{rand.randint(1, 40)}]</a></sup></p>'
+
+def makeImage(rand, index):
+    # faint noise over a gradient compresses about like a photo, so decode and resize costs are realistic.
+    # Every fifth image is a smaller PNG, as diagrams and maps usually are
+    if index % 5 == 4:
+        width, height = rand.randint(400, 800), rand.randint(300, 600)
+    else:
+        width, height = rand.randint(800, 1600), rand.randint(600, 1200)
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), rand.randint(5, 10))
+    image = Image.merge('RGB', (gradient, noise, Image.blend(gradient, noise, 0.5)))
+    out = io.BytesIO()
+    if index % 5 == 4:
+        image.save(out, 'PNG')
+        return out.getvalue(), '.png'
+    image.save(out, 'JPEG', quality=85)
+    return out.getvalue(), '.jpg'
+
+def generate(name, spec, folder):
+    rand = random.Random(f'{name}-{corpusVersion}')
+    os.makedirs(os.path.join(folder, 'files'), exist_ok=True)
+    topic = f'Benchmark {name}'
+    files = {}
+
+    links = []
+    for index in range(spec['images']):
+        data, ext = makeImage(rand, index)
+        fileName = f'Bench_{name}_{index}{ext}'
+        link = f'https://upload.wikimedia.org/wikipedia/commons/thumb/{index%10}/{index:02d}/{fileName}/1200px-{fileName}'
+        with open(os.path.join(folder, 'files', fileName), 'wb') as f:
+            f.write(data)
+        files[link] = os.path.join('files', fileName)
+        links.append(link)
+
+    sections = []
+    for s in range(spec['sections']):
+        title = f'{sentence(rand).split()[0]} {s}'
+        figures = ''
+        for k in range(spec['figures'] if s % 3 != 2 else 0):
+            link = links[(s*spec['figures'] + k) % len(links)] # wraps around, so bigger decks reuse some images
+            figures += (f'<figure typeof="mw:File/Thumb"><a href="/wiki/File:x"><img src="{link}" alt="{sentence(rand)}"></a>'
+                        f'<figcaption>{sentence(rand)} {sentence(rand)}</figcaption></figure>')
+        paragraphs = spec['paragraphs'] * (8 if s < spec['longSections'] else 1)
+        body = ''.join(paragraph(rand, rand.randint(3, 9)) for _ in range(paragraphs))
+        sections.append(f'<div class="mw-heading mw-heading2"><h2 id="{title.replace(" ", "_")}">{title}</h2></div>{figures}{body}')
+
+    references = ''.join(
+        f'<li id="cite_note-{i}"><span class="mw-cite-backlink"><b><a href="#cite_ref-{i}">^</a></b></span> '
+        f'<span class="reference-text"><cite class="citation">{sentence(rand)}</cite> <a class="external" href="https://example.org/{i}">link</a></span></li>'
+        for i in range(1, 41)
+    )
+    html = (f'<!DOCTYPE html><html><head><title>{topic}</title><script>"wgRevisionId":{rand.randint(10**8, 10**9)},</script></head>'
+            f'<body><div id="mw-content-text"><div class="mw-content-ltr mw-parser-output">{paragraph(rand, 6)}{"".join(sections)}'
+            f'<div class="mw-heading mw-heading2"><h2 id="See_also">See also</h2></div><ul><li>{sentence(rand)}</li></ul>'
+            f'<div class="mw-heading mw-heading2"><h2 id="References">References</h2></div><div class="reflist"><ol class="references">{references}</ol></div>'
+            f'</div></div></body></html>')
+    with open(os.path.join(folder, 'page.html'), 'w', encoding='utf-8') as f:
+        f.write(html)
+
+    manifest = {'url': f'https://en.wikipedia.org/wiki/{topic.replace(" ", "_")}', 'topic': topic, 'files': files, 'version': corpusVersion}
+    with open(os.path.join(folder, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+
+def recorded():
+    if not os.path.isdir(recordedDir):
+        return []
+    return sorted(name for name in os.listdir(recordedDir) if os.path.exists(os.path.join(recordedDir, name, 'manifest.json')))
+
+def fixtureFolder(name):
+    # a recorded article, or one of the synthetic sizes (generated if missing or stale)
+    folder = os.path.join(recordedDir, name)
+    if os.path.exists(os.path.join(folder, 'manifest.json')):
+        return folder
+    if name not in sizes:
+        raise KeyError(f"no fixture called {name!r}: expected one of {sorted(sizes) + recorded()}")
+
+    folder = os.path.join(generatedDir, name)
+    manifestPath = os.path.join(folder, 'manifest.json')
+    if os.path.exists(manifestPath):
+        with open(manifestPath, encoding='utf-8') as f:
+            if json.load(f).get('version') == corpusVersion:
+                return folder
+    print(f"Generating {name} fixture in {folder}", flush=True)
+    generate(name, sizes[name], folder)
+    return folder
+
+def load(name):
+    # returns (page url, topic, {url: absolute file path}) with the page itself in the map
+    folder = fixtureFolder(name)
+    with open(os.path.join(folder, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    files = {link: os.path.join(folder, path) for link, path in manifest['files'].items()}
+    files[manifest['url']] = os.path.join(folder, 'page.html')
+    return manifest['url'], manifest['topic'], files
@@ -0,0 +1,93 @@
+# OpenAI-compatible chat completions server for benchmarks, with a fixed latency per request, an optional
+# share of 429 responses and an optional requests-per-minute limit enforced like the real API's. Answers are
+# cheap deterministic stand-ins shaped like real bullets and captions.
+
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True # headers and body are separate writes, don't let them wait for a delayed ACK
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            limited = server.random.random() < server.rateLimited
+            retryAfter = 0.05
+            if server.rpm and not limited:
+                # a bucket of one second's worth of requests, refilled continuously
+                now = time.monotonic()
+                server.allowance = min(server.rpm/60, server.allowance + (now - server.checked) * server.rpm/60)
+                server.checked = now
+                if server.allowance < 1:
+                    limited = True
+                    retryAfter = (1 - server.allowance) / (server.rpm/60)
+                else:
+                    server.allowance -= 1
+            if limited:
+                server.limited += 1
+
+        if limited:
+            self.reply(429, {'error': {'message': 'Rate limit reached', 'type': 'requests'}}, {'retry-after': f'{retryAfter:.3f}'})
+            return
+
+        time.sleep(server.latency)
+        text = request['messages'][-1]['content']
+        words = text.split()
+        if request.get('max_tokens', 0) <= 30:
+            content = ' '.join(words[-6:])
+        else:
+            content = '\n'.join(' '.join(words[i*12:i*12+10]) for i in range(5))
+        promptTokens = sum(len(message['content']) for message in request['messages']) // 4
+        self.reply(200, {
+            'id': f'chatcmpl-{server.requests}', 'object': 'chat.completion', 'created': int(time.time()), 'model': request['model'],
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': promptTokens, 'completion_tokens': len(content)//4, 'total_tokens': promptTokens + len(content)//4},
+        })
+
+    def reply(self, status, body, headers={}):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+def serve(latency=0.3, rateLimited=0.0, port=0, seed=0, rpm=0):
+    # start the server on a background thread, returns it (its base url is server.url)
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.rateLimited = rateLimited
+    server.random = random.Random(seed)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.limited = 0
+    server.rpm = rpm
+    server.allowance = rpm/60
+    server.checked = time.monotonic()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/v1'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Run a fake OpenAI chat completions endpoint.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.3, help='seconds per completion')
+    parser.add_argument('--rate-limited', type=float, default=0.0, help='share of requests answered with 429')
+    parser.add_argument('--rpm', type=float, default=0, help='requests per minute before answering 429 (0 for no limit)')
+    args = parser.parse_args()
+    server = serve(args.latency, args.rate_limited, args.port, rpm=args.rpm)
+    print(f'Fake OpenAI listening on {server.url} (set OPENAI_BASE_URL to it)')
+    threading.Event().wait()
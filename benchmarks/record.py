@@ -0,0 +1,62 @@
+# Records Wikipedia articles as benchmark fixtures: the article HTML plus every image the pipeline would
+# consider for it, saved under benchmarks/fixtures/<Title>/ with a manifest mapping original URLs to files.
+#
+#   python benchmarks/record.py Hindenburg_disaster "Apollo 11" https://en.wikipedia.org/wiki/Rust_(programming_language)
+
+import argparse
+import json
+import os
+import re
+import sys
+
+import corpus
+
+def safeName(text):
+    return re.sub(r'[^\w.-]+', '_', text)
+
+def record(line, pipeline, session):
+    pageUrl, topic = pipeline.topicFromLine(line)
+    name = safeName(topic)
+    folder = os.path.join(corpus.recordedDir, name)
+    response = session.get(pageUrl, timeout=(5, 30))
+    response.raise_for_status()
+    os.makedirs(os.path.join(folder, 'files'), exist_ok=True)
+    with open(os.path.join(folder, 'page.html'), 'w', encoding='utf-8') as f:
+        f.write(response.text)
+
+    links = []
+    for kind, title, text, candidates in pipeline.articleSections({'url': pageUrl, 'html': response.text}):
+        links += [link for link, caption in candidates if link not in links]
+
+    files = {}
+    for index, link in enumerate(links):
+        try:
+            r = session.get(link, timeout=(5, 30))
+            r.raise_for_status()
+        except Exception as e:
+            print(f"  skipped {link}: {e}")
+            continue
+        fileName = f"{index:03d}_{safeName(os.path.basename(link.split('?', 1)[0]))[-80:]}"
+        with open(os.path.join(folder, 'files', fileName), 'wb') as f:
+            f.write(r.content)
+        files[link] = os.path.join('files', fileName)
+
+    with open(os.path.join(folder, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'url': pageUrl, 'topic': topic, 'files': files}, f, indent=1)
+    print(f"{topic}: {len(response.content)} bytes of HTML, {len(files)}/{len(links)} images -> {folder}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record Wikipedia articles and their images as benchmark fixtures.')
+    parser.add_argument('articles', nargs='+', help='article titles or URLs')
+    args = parser.parse_args()
+
+    pipeline = corpus.loadPipeline()
+    session = pipeline.makeSession()
+    failed = 0
+    for line in args.articles:
+        try:
+            record(line, pipeline, session)
+        except Exception as e:
+            failed += 1
+            print(f"{line}: FAILED ({type(e).__name__}: {e})")
+    sys.exit(1 if failed else 0)
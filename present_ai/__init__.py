@@ -0,0 +1,41 @@
+# Present-AI: PowerPoint decks from Wikipedia articles. The names below are imported from their modules on
+# first use, so importing the package costs nothing until something is actually built
+
+from importlib import import_module
+
+exports = {
+    'agents': ['callAI', 'askAI', 'summariseCaption', 'makeBulletPoints', 'mergeBulletPoints', 'summariseBody',
+              'countTokens', 'chunkText', 'estimateTokens', 'requestCost'],
+    'assets': ['AssetStore', 'openAssetStore'],
+    'batch': ['initWorker', 'batchWorker', 'runBatch', 'readTopics', 'openFile'],
+    'builder': ['DeckBuilder', 'sectionImages', 'mergedSections'],
+    'cache': ['CompletionCache', 'openCompletionCache'],
+    'config': ['aiWorkers', 'aiRetries', 'aiBackoff', 'chunkTokens', 'sectionsAhead', 'imageWorkers', 'imageDpi',
+              'imagesPerHost', 'imagesPerSlide', 'avoidedContents', 'localAvoidedContents', 'referenceSections', 'avoidedImages',
+              'htmlParser', 'defaultLanguage'],
+    'fetchers': ['PageFetcher', 'HtmlFetcher', 'RestFetcher', 'StubFetcher', 'PageCache', 'openPageCache',
+                'makeFetcher', 'topicFromLine', 'sourcesFromLine', 'wikiLanguage', 'deckName', 'pageRevision'],
+    'images': ['DeckImages', 'downloadImage', 'downloadImages', 'normaliseImage', 'placeImage'],
+    'layout': ['layoutSlides', 'layoutImages', 'fitFontSize', 'getImageSize'],
+    'net': ['makeSession', 'hostLimit'],
+    'report': ['RunReport', 'percentile', 'span'],
+    'scraping': ['articleSections', 'sectionFingerprint', 'parseSections', 'readSection', 'imageLink', 'extractRefs'],
+    'scheduler': ['LLMScheduler', 'TokenBucket', 'DeckBudget', 'BudgetExceeded', 'llmScheduler'],
+    'search': ['searchWikipedia'],
+    'service': ['DeckService', 'JobReport'],
+    'store': ['SqliteStore', 'storeLocation', 'storeMegabytes'],
+    'slides': ['addTitleSlide', 'setSubtitle', 'renderSlide', 'addRefsSlide', 'saveDeck', 'copyDeck'],
+    'summarisers': ['Summariser', 'OpenAISummariser', 'LocalSummariser', 'makeSummariser'],
+}
+owners = {name: module for module, names in exports.items() for name in names}
+__all__ = sorted(owners)
+
+def __getattr__(name):
+    if name not in owners:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f'.{owners[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(owners))
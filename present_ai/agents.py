@@ -0,0 +1,244 @@
+# OpenAI requests: retries, caching and instrumentation around each call, and the map-reduce over long sections
+
+import random
+import re
+import time
+from functools import lru_cache
+
+from .config import aiBackoff, aiRetries, modelPrices
+from .report import span
+from .scheduler import BudgetExceeded, llmScheduler
+
+stagePriorities = {'llm.merge': 0, 'llm.bullets': 1, 'llm.caption': 2} # finishing slides first, captions last
+
+def callAI(ai,info,priority=1,tokens=0,**request):
+    # every request waits its turn in the process's scheduler. Rate limits, timeouts, dropped connections and
+    # server errors are retried with jittered exponential backoff, honouring retry-after when sent
+    from openai import APIConnectionError, InternalServerError, RateLimitError
+    scheduler = llmScheduler()
+    info['queued'] = 0.0
+    for attempt in range(aiRetries + 1):
+        info['retries'] = attempt
+        info['queued'] += scheduler.acquire(priority, tokens)
+        try:
+            completion = ai.chat.completions.create(**request)
+        except (RateLimitError, APIConnectionError, InternalServerError) as e:
+            if attempt == aiRetries:
+                raise
+            delay = retryDelay(e, attempt)
+            if isinstance(e, RateLimitError):
+                scheduler.throttle(delay)
+            time.sleep(delay)
+            continue
+        scheduler.succeeded()
+        return completion
+
+def retryDelay(error,attempt):
+    # jittered so requests turned away together don't all come back together
+    response = getattr(error, 'response', None)
+    try:
+        return float(response.headers.get('retry-after')) * random.uniform(1, 1.5) # never sooner than asked
+    except (AttributeError, TypeError, ValueError):
+        return aiBackoff * 2**attempt * random.uniform(0.5, 1.5)
+
+def askAI(ai,cache,report,stage,budget=None,**request):
+    # deterministic requests are answered from the completion cache when possible. The others are costed
+    # against the deck's budget before they are sent (BudgetExceeded when it can't cover them). ai is the
+    # OpenAI client, or a function that makes it, called only once a request has to go out
+    with span(report, stage, model=request['model']) as info:
+        cacheable = cache is not None and request.get('temperature') == 0.0
+        info['cached'] = False
+        if cacheable:
+            key = cache.key(request)
+            content = cache.get(key)
+            if content is not None:
+                info['cached'] = True
+                return content
+
+        promptTokens = estimateTokens(request['messages'])
+        worstCase = requestCost(request['model'], promptTokens, request.get('max_tokens', 0))
+        if budget is not None and not budget.reserve(worstCase):
+            raise BudgetExceeded(f"{stage} would take the deck over its ${budget.cap:.2f} budget ({budget.stats()} spent)")
+        cost = 0.0
+        try:
+            if callable(ai):
+                ai = ai()
+            completion = callAI(ai,info,stagePriorities.get(stage, 1),promptTokens + request.get('max_tokens', 0),**request)
+            cost = worstCase
+            if completion.usage is not None:
+                info['prompt_tokens'] = completion.usage.prompt_tokens
+                info['completion_tokens'] = completion.usage.completion_tokens
+                cost = requestCost(request['model'], completion.usage.prompt_tokens, completion.usage.completion_tokens)
+        finally:
+            if budget is not None:
+                budget.settle(worstCase, cost)
+        info['cost'] = round(cost, 6)
+        content = completion.choices[0].message.content
+        if cacheable:
+            cache.put(key, content)
+        return content
+
+def estimateTokens(messages):
+    # prompt tokens as the API will count them: each message's content plus a few tokens of framing
+    return sum(countTokens(message['content']) + 4 for message in messages) + 3
+
+def requestCost(model,promptTokens,completionTokens):
+    promptPrice, completionPrice = modelPrices.get(model, modelPrices['gpt-3.5-turbo'])
+    return (promptTokens*promptPrice + completionTokens*completionPrice) / 1e6
+
+def summariseCaption(captionText,ai,cache=None,report=None,budget=None):
+    if not captionText:
+        return ""
+    content = askAI(ai,cache,report,'llm.caption',budget,
+        model='gpt-3.5-turbo',
+        temperature=0.0,
+        max_tokens=30,
+        messages=[
+            {
+                'role': 'system',
+                'content': (
+                    "You are a caption expert. Summarize the following text into a single, "
+                    "descriptive phrase between 5 and 8 words. Do not use quotes, "
+                    "citations, or starting dashes. Output only the summarized phrase."
+                )
+            },
+            {
+                'role': 'user',
+                'content': f"Summarize this caption: {captionText}"
+            }
+        ]
+    )
+    return content.strip()
+
+bulletRules = (
+    "You are an expert slide-writer that converts a chunk of text into "
+    "concise PowerPoint bullet points. STRICT RULES - follow them exactly:\n"
+    "1) Output a single joined string splitting each bullet point with a line break character.\n"
+    "2) NEVER put dashes (-) at the start of each bullet point, each bullet should be its own bit of concise info\n"
+    "3) You MUST produce between 4 and 8 bullet points. The total number of line breaks in your output CANNOT exceed 7 (for a maximum of 8 lines). This rule is non-negotiable.\n"
+    "4) The absolute maximum output length is 120 words and 600 characters.\n"
+    "5) Each bullet should be a single short sentence or phrase, ideally 6-15 words\n"
+    "6) Do not include citations, bracketed references, html, or source text.\n"
+    "7) Use plain text only; do not return markdown, lists, headings or extra fields.\n"
+    "8) If the input is short or has too little content, still return 4 concise bullets.\n"
+    "9) If you cannot identify 4 meaningful bullets, return the four best short summary phrases.\n"
+    "Tone: neutral, factual, slide-friendly.\n"
+    "Example input -> output:\n"
+    "Input: 'The Hindenburg disaster occurred in 1937 when the German passenger airship LZ 129 Hindenburg caught fire while docking in New Jersey.'\n"
+    "Output: 'Hindenburg disaster: LZ 129 caught fire while docking (1937)\nMajor loss of life and media coverage\nFire highlighted hydrogen safety risks\nInvestigation identified cause as static electricity'"
+)
+
+def makeBulletPoints(visibleText,ai,cache=None,report=None,budget=None):
+    # Prepare the assistant call to produce strict JSON output:
+    return askAI(ai,cache,report,'llm.bullets',budget,
+        model='gpt-3.5-turbo',
+        temperature=0.0, # deterministic
+        max_tokens=400,
+        messages=[
+            {
+                'role': 'system',
+                'content': bulletRules
+            },
+            {
+                'role': 'user',
+                'content': (
+                    "Convert the following text into slide-ready bullets. "
+                    "Remember the strict limits above.\n\n"
+                    f"Text: {visibleText}"
+                )
+            }
+        ]
+    )
+
+def mergeBulletPoints(bulletText,ai,cache=None,report=None,budget=None):
+    # reduce step: bullets from consecutive chunks of one section become the slide's 4-8 bullets
+    return askAI(ai,cache,report,'llm.merge',budget,
+        model='gpt-3.5-turbo',
+        temperature=0.0,
+        max_tokens=400,
+        messages=[
+            {
+                'role': 'system',
+                'content': bulletRules
+            },
+            {
+                'role': 'user',
+                'content': (
+                    "The following bullet points summarise consecutive parts of one text. "
+                    "Merge them into a single set of slide-ready bullets covering the whole text. "
+                    "Remember the strict limits above.\n\n"
+                    f"Bullets: {bulletText}"
+                )
+            }
+        ]
+    )
+
+def summariseBody(body,summariser,llmPool,report=None):
+    # runs on the section pool, with every request sent from llmPool so PRESENT_AI_WORKERS bounds them: a body
+    # that fits the token budget is one request, a longer one is split on paragraph and sentence boundaries,
+    # its chunks summarised in parallel and the results merged
+    budget = summariser.chunkTokens
+    chunks = chunkText(body, budget) if budget else [body]
+    if len(chunks) <= 1:
+        return llmPool.submit(summariser.bulletPoints, body, report).result()
+
+    jobs = [llmPool.submit(summariser.bulletPoints, chunk, report) for chunk in chunks]
+    bulletLists = [job.result() for job in jobs]
+
+    groups = chunkText('\n\n'.join(bulletLists), budget)
+    while len(groups) > 1: # more chunk bullets than one request can take, merge them in parallel rounds
+        jobs = [llmPool.submit(summariser.mergeBulletPoints, group, report) for group in groups]
+        groups = chunkText('\n\n'.join(job.result() for job in jobs), budget)
+    return llmPool.submit(summariser.mergeBulletPoints, groups[0], report).result()
+
+def countTokens(text):
+    encoding = tokenEncoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text)//4 + 1 # roughly four characters per token for English text
+
+def chunkText(text,budget):
+    # pack paragraphs (split into sentences, then words, only when one alone is over budget) into
+    # chunks of at most budget tokens, keeping their order
+    pieces = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = countTokens(paragraph)
+        if tokens <= budget:
+            pieces.append((paragraph, tokens))
+            continue
+        for sentence in re.split(r'(?<=[.!?])\s+', paragraph):
+            tokens = countTokens(sentence)
+            if tokens <= budget:
+                pieces.append((sentence, tokens))
+                continue
+            words = sentence.split()
+            step = max(1, len(words) * budget // tokens)
+            for start in range(0, len(words), step):
+                part = ' '.join(words[start:start+step])
+                pieces.append((part, countTokens(part)))
+
+    chunks = []
+    current = []
+    used = 0
+    for piece, tokens in pieces:
+        if current and used + tokens > budget:
+            chunks.append('\n\n'.join(current))
+            current = []
+            used = 0
+        current.append(piece)
+        used += tokens
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+@lru_cache(maxsize=1)
+def tokenEncoding():
+    # optional, exact token counts for chunking
+    try:
+        import tiktoken
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception: # not installed, or its encoding file can't be fetched
+        return None
@@ -0,0 +1,98 @@
+# Image store shared across decks and runs
+
+import os
+import threading
+import time
+
+from .config import imageDpi
+from .store import SqliteStore, storeLocation, storeMegabytes
+
+class AssetStore(SqliteStore):
+    # content-addressed store of normalised images shared by every deck and run. Files are named by the hash
+    # of their source bytes, and an index maps each source URL to its file plus the validators for conditional GETs
+    table = 'files'
+    keyColumn = 'name'
+
+    def __init__(self, folder, maxBytes=2048*1024*1024, freshFor=24*3600):
+        super().__init__(os.path.join(folder, 'index.sqlite'), maxBytes, [
+            'CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, size INTEGER NOT NULL, used REAL NOT NULL)',
+            'CREATE INDEX IF NOT EXISTS files_used ON files (used)',
+            'CREATE TABLE IF NOT EXISTS urls ('
+            'url TEXT PRIMARY KEY, name TEXT NOT NULL, digest TEXT NOT NULL, dpi INTEGER NOT NULL, '
+            'width INTEGER NOT NULL, height INTEGER NOT NULL, etag TEXT, modified TEXT, checked REAL NOT NULL)',
+        ])
+        self.folder = folder
+        self.freshFor = freshFor # seconds a stored url is reused without asking the server again
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def path(self, name):
+        return os.path.join(self.folder, name[:2], name)
+
+    def lookup(self, url):
+        with self.lock:
+            row = self.db.execute(
+                'SELECT name, digest, width, height, etag, modified, checked FROM urls WHERE url = ? AND dpi = ?', (url, imageDpi)
+            ).fetchone()
+        if row is None or not os.path.exists(self.path(row[0])):
+            return None
+        name, digest, width, height, etag, modified, checked = row
+        return {
+            'name': name, 'path': self.path(name), 'digest': digest, 'ext': os.path.splitext(name)[1],
+            'size': (width, height), 'etag': etag, 'modified': modified, 'fresh': time.time() - checked < self.freshFor,
+        }
+
+    def reuse(self, url, entry, revalidated=False):
+        now = time.time()
+        with self.lock:
+            if revalidated:
+                self.revalidated += 1
+                self.db.execute('UPDATE urls SET checked = ? WHERE url = ?', (now, url))
+            else:
+                self.hits += 1
+            self.db.execute('UPDATE files SET used = ? WHERE name = ?', (now, entry['name']))
+            self.db.commit()
+        return entry['digest'], entry['path'], entry['ext'], entry['size']
+
+    def store(self, url, digest, data, ext, size, etag, modified):
+        name = f"{digest}-{imageDpi}{ext}"
+        path = self.path(name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp, 'wb') as f:
+                f.write(data)
+            os.replace(temp, path) # other processes never see a half written file
+
+        now = time.time()
+        with self.lock:
+            self.misses += 1
+            self.db.execute('INSERT OR REPLACE INTO files (name, size, used) VALUES (?, ?, ?)', (name, len(data), now))
+            self.db.execute(
+                'INSERT OR REPLACE INTO urls (url, name, digest, dpi, width, height, etag, modified, checked) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, name, digest, imageDpi, size[0], size[1], etag, modified, now)
+            )
+            self.added(len(data), now, keep=name)
+            self.db.commit()
+        return path
+
+    def remove(self, name):
+        # an evicted file goes with every url pointing at it
+        self.db.execute('DELETE FROM files WHERE name = ?', (name,))
+        self.db.execute('DELETE FROM urls WHERE name = ?', (name,))
+        try:
+            os.remove(self.path(name)) # decks that hardlinked it keep their copy
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        return f"{self.hits} reused, {self.revalidated} revalidated, {self.misses} downloaded"
+
+def openAssetStore():
+    folder = storeLocation('PRESENT_AI_ASSETS', 'assets')
+    if folder is None:
+        return None
+    maxBytes = storeMegabytes('PRESENT_AI_ASSETS_MB', 2048)
+    freshFor = float(os.environ.get('PRESENT_AI_ASSETS_FRESH_HOURS', 24)) * 3600
+    return AssetStore(folder, maxBytes, freshFor)
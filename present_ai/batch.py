@@ -0,0 +1,110 @@
+# Batch runs over many topics in worker processes
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .builder import DeckBuilder
+from .fetchers import makeFetcher, sourcesFromLine
+from .net import makeSession
+from .report import RunReport
+from .summarisers import OpenAISummariser, makeSummariser
+
+def openFile(path):
+    if sys.platform == 'win32':
+        os.startfile(path)
+    elif sys.platform == 'darwin':
+        subprocess.run(['open', path])
+    elif shutil.which('xdg-open'):
+        subprocess.run(['xdg-open', path])
+
+def initWorker(outputDir,reportDir,summariserName,incremental=False,fetcherName='rest',keepArtifacts=False,llmShare=1.0):
+    # one builder per worker process, so its session, client and cache connection stay warm between decks
+    global workerBuilder, workerReportDir
+    from .scheduler import llmScheduler
+    llmScheduler().setShare(llmShare) # the workers split the API key's rate limits between them
+    session = makeSession()
+    workerBuilder = DeckBuilder(session=session, summariser=makeSummariser(summariserName), outputDir=outputDir, verbose=False,
+                                incremental=incremental, fetcher=makeFetcher(fetcherName, session), keepArtifacts=keepArtifacts)
+    workerReportDir = reportDir
+
+def batchWorker(index,line,pageUrl,topic):
+    result = {'index': index, 'input': line, 'topic': topic, 'url': pageUrl}
+    report = RunReport()
+    start = time.time()
+    try:
+        result['path'] = workerBuilder.build(pageUrl,topic,report)
+        result['ok'] = True
+    except Exception as e:
+        result['ok'] = False
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.time()-start, 2)
+    result['stages'] = report.stages()
+    if workerReportDir:
+        os.makedirs(workerReportDir, exist_ok=True)
+        report.write(os.path.join(workerReportDir, f"{index:04d}_{topic.replace(' ','_').replace('/','_')}.trace.json"))
+    return result
+
+def runBatch(lines,jobs,summaryPath,outputDir='.',reportDir=None,summariserName='openai',incremental=False,fetcherName='rest',
+             keepArtifacts=False,language=None):
+    start = time.time()
+    results = []
+
+    # the summariser is made here first, so a bad setting stops the batch with one message instead of failing
+    # every worker. Without a key only incremental runs can get anywhere, from the completion cache
+    summariser = makeSummariser(summariserName)
+    if isinstance(summariser, OpenAISummariser) and 'OPENAI_API_KEY' not in os.environ and not incremental:
+        raise ValueError("OPENAI_API_KEY is not set (use --summariser local to build decks without OpenAI)")
+
+    # one bulk revision lookup up front, so the workers read unchanged articles straight from the page cache
+    sources = [sourcesFromLine(line, language) for line in lines]
+    makeFetcher(fetcherName).prefetch([url for pageUrl, topic in sources for url in ([pageUrl] if isinstance(pageUrl, str) else pageUrl)])
+
+    llmShare = 1 / max(1, min(jobs, len(lines)))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initWorker,
+                             initargs=(outputDir,reportDir,summariserName,incremental,fetcherName,keepArtifacts,llmShare)) as pool:
+        futures = {pool.submit(batchWorker, index, line, *sources[index]): index for index, line in enumerate(lines)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                result = future.result()
+            except Exception as e: # the worker process died or could not start, the topic still gets its result
+                index = futures[future]
+                result = {'index': index, 'input': lines[index], 'topic': sources[index][1], 'url': sources[index][0], 'ok': False,
+                          'error': f"{type(e).__name__}: {e}", 'seconds': 0.0, 'stages': {}}
+            results.append(result)
+            if result['ok']:
+                status = f"done in {result['seconds']}s -> {result['path']}"
+            else:
+                status = f"FAILED after {result['seconds']}s ({result['error']})"
+            print(f"[{done}/{len(lines)}] {result['topic']}: {status}", flush=True)
+
+    results.sort(key=lambda result: result['index'])
+    succeeded = sum(result['ok'] for result in results)
+    summary = {
+        'decks': len(results),
+        'succeeded': succeeded,
+        'failed': len(results)-succeeded,
+        'jobs': jobs,
+        'summariser': summariserName,
+        'seconds': round(time.time()-start, 2),
+        'results': results,
+    }
+
+    if summaryPath == '-':
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    else:
+        with open(summaryPath, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Batch finished: {succeeded}/{len(results)} decks in {summary['seconds']} seconds, summary in {summaryPath}")
+
+    return summary
+
+def readTopics(path):
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    with f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
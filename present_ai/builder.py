@@ -0,0 +1,209 @@
+# Building a deck from an article
+
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .agents import summariseBody
+from .assets import openAssetStore
+from .config import aiWorkers, imagesPerSlide, manifestVersion, sectionsAhead, sourceWorkers
+from .fetchers import deckName, makeFetcher, wikiLanguage
+from .manifest import CachedResult, reusableSection, sectionHash, writeManifest
+from .net import makeSession
+from .report import span
+from .summarisers import OpenAISummariser
+
+sourcePool = ThreadPoolExecutor(max_workers=sourceWorkers) # fetches and parses the extra sources of multi-source decks
+
+def sectionImages(section,candidates,session,summariser,llmPool,deckImages,assets=None,report=None):
+    from .images import downloadImages
+    # runs on the section pool: download this section's images, then caption the ones that arrived
+    images = downloadImages([(section, candidates)], session, deckImages, assets, report, imagesPerSlide)[0]
+    captionJobs = [llmPool.submit(summariser.caption, caption, report) for image, caption, size in images]
+    return [(image, job.result(), size) for (image, caption, size), job in zip(images, captionJobs)]
+
+def mergedSections(pages,report=None,verbose=False):
+    from .scraping import articleSections, sectionFingerprint
+    # the sections of every source in turn: the first source's as it is parsed, while the others are parsed
+    # on the source pool. A later source's section is dropped when an earlier one has the same title or text,
+    # and a later source that fails to parse is left out
+    if len(pages) == 1:
+        yield from articleSections(pages[0],report)
+        return
+    parsed = [sourcePool.submit(list, articleSections(page,report)) for page in pages[1:]]
+    seenTitles, seenTexts = set(), set()
+    duplicates = 0
+    for index, sections in enumerate([articleSections(pages[0],report)] + parsed):
+        if index:
+            try:
+                sections = sections.result()
+            except Exception as e:
+                print(f"Skipping source {pages[index]['url']}: {type(e).__name__}: {e}")
+                continue
+        for kind, title, text, candidates in sections:
+            if kind == 'section':
+                fingerprint = sectionFingerprint(text)
+                if index and (title.casefold() in seenTitles or (text.strip() and fingerprint in seenTexts)):
+                    duplicates += 1
+                    continue
+                seenTitles.add(title.casefold())
+                seenTexts.add(fingerprint)
+            yield kind, title, text, candidates
+    if verbose and duplicates:
+        print(f"Skipped {duplicates} sections already covered by an earlier source")
+
+class DeckBuilder:
+    # holds everything one run needs, so any number of builders (or threads sharing one) can build decks side by side
+
+    def __init__(self, session=None, summariser=None, outputDir='.', assets=None, verbose=True, ai=None, cache=None, incremental=False, fetcher=None,
+                 keepArtifacts=False):
+        self.session = session or makeSession()
+        self.fetcher = fetcher or makeFetcher(os.environ.get('PRESENT_AI_FETCHER', 'rest'), self.session)
+        # ai and cache are shorthand for the default OpenAI summariser
+        self.summariser = summariser or OpenAISummariser(ai, cache)
+        self.assets = assets if assets is not None else openAssetStore()
+        self.outputDir = outputDir
+        self.verbose = verbose
+        self.incremental = incremental # reuse the slide content of sections unchanged since the last build
+        # keep each deck's images and manifest in a folder beside it; incremental builds work from them
+        self.keepArtifacts = keepArtifacts or incremental
+
+    def build(self,url,topic,report=None,output=None):
+        # url is an article URL, or a list of them whose sections are merged into one deck (in priority order).
+        # output is a binary stream to write the deck to (io.BytesIO, sys.stdout.buffer, an upload) instead of
+        # '<outputDir>/<topic> Powerpoint.pptx'. Returns that path when the deck is on disk, otherwise output
+        with span(report, 'deck', topic=topic):
+            return self.buildDeck(url,topic,report,output)
+
+    def buildDeck(self,url,topic,report,output=None):
+        urls = [url] if isinstance(url, str) else list(url)
+        name = deckName(urls[0] if len(urls) == 1 else urls, topic)
+        pages = self.fetchSources(urls, report)
+        url = pages[0]['url'] if len(pages) == 1 else [page['url'] for page in pages] # the sources the deck is built from
+
+        deckFolder = os.path.join(self.outputDir, name.replace(' ','_'))
+        powerpointName = os.path.join(self.outputDir, '{} Powerpoint.pptx'.format(name))
+        revisions = [page['revision'] for page in pages]
+        revision = revisions[0] if len(revisions) == 1 else (None if None in revisions else revisions)
+        previous = self.previousManifest(deckFolder, powerpointName) if self.incremental else None
+        if previous and revision is not None and previous['revision'] == revision and previous['url'] == url:
+            if self.verbose:
+                print(f"{topic} is up to date (revision {revision})")
+            if output is None:
+                return powerpointName
+            from .slides import copyDeck
+            copyDeck(powerpointName, output)
+            return powerpointName
+        # the parsing, imaging and pptx stacks are only loaded once there is a deck to build
+        from pptx import Presentation
+        from .images import DeckImages
+        from .layout import layoutSlides
+        from .slides import addRefsSlide, addTitleSlide, copyDeck, renderSlide, saveDeck, setSubtitle
+
+        manifest = {'version': manifestVersion, 'url': url, 'revision': revision,
+                    'summariser': type(self.summariser).__name__, 'imagesPerSlide': imagesPerSlide, 'sections': {}}
+        presentation = Presentation()
+        subtitle = addTitleSlide(presentation,topic)
+        summariser = self.summariser.forDeck(wikiLanguage(urls[0])) # carries this deck's language and completion budget
+
+        subTopicTitles = []
+        referencesContent = ''
+        slides = [] # (title, notes, bullets, images) per finished section, laid out and drawn once all are in
+        pending = deque() # sections in flight, oldest first
+        deckImages = DeckImages(deckFolder if self.keepArtifacts else None)
+
+        # each section goes straight into bullet summarisation and image fetch + captioning as soon as it is
+        # parsed, and slides are added in order as soon as the sections before them are done
+        with ThreadPoolExecutor(max_workers=aiWorkers) as llmPool, ThreadPoolExecutor(max_workers=2*sectionsAhead) as sectionPool:
+            for kind, subTopicTitle, body, candidates in mergedSections(pages,report,self.verbose):
+                if kind == 'section':
+                    key = sectionHash(body, candidates)
+
+                    cached = reusableSection(previous, subTopicTitle, key, deckFolder)
+                    if cached:
+                        with span(report, 'section.reuse', title=subTopicTitle):
+                            bulletJob, imagesJob = CachedResult(cached[0]), CachedResult(cached[1])
+                    else:
+                        bulletJob = sectionPool.submit(summariseBody, body, summariser, llmPool, report)
+                        imagesJob = sectionPool.submit(sectionImages, subTopicTitle, candidates, self.session, summariser, llmPool, deckImages, self.assets, report)
+                    # only the speaker notes part of the body is kept past this point
+                    pending.append((subTopicTitle, body[:5000], bulletJob, imagesJob, key))
+                    subTopicTitles.append(subTopicTitle)
+                elif len(referencesContent)<2000:
+                    referencesContent += body[:2000]+'\n'+'And more...'
+
+                while len(pending) > sectionsAhead: # bound the sections held in memory
+                    self.addNextSlide(slides,pending.popleft(),manifest,deckFolder)
+
+            while pending:
+                self.addNextSlide(slides,pending.popleft(),manifest,deckFolder)
+
+        setSubtitle(subtitle,subTopicTitles)
+        with span(report, 'deck.layout', slides=len(slides)):
+            layouts = layoutSlides(slides)
+        for layout in layouts:
+            if self.verbose:
+                print("ADDING SLIDE:", layout['title'])
+            with span(report, 'slide.build', title=layout['title'], images=len(layout['pictures'])):
+                renderSlide(presentation,layout)
+        if self.verbose:
+            print("ADDING SLIDE: References")
+        with span(report, 'slide.build', title='References'):
+            addRefsSlide(presentation,referencesContent,url)
+
+        with span(report, 'deck.save') as info:
+            if output is not None and not self.keepArtifacts: # nothing of this deck touches the disk
+                info['bytes'] = saveDeck(presentation, output)
+                return output
+            os.makedirs(self.outputDir, exist_ok=True)
+            presentation.save(powerpointName)
+            info['bytes'] = os.path.getsize(powerpointName)
+            if output is not None:
+                copyDeck(powerpointName, output)
+        if self.keepArtifacts:
+            writeManifest(deckFolder, manifest)
+        if self.verbose and getattr(summariser, 'budget', None) is not None:
+            print(f"Completions cost {summariser.budget.stats()}")
+        if self.verbose and previous:
+            reused = sum(section['reused'] for section in manifest['sections'].values())
+            print(f"Reused {reused} of {len(manifest['sections'])} sections from revision {previous['revision']}")
+        return powerpointName
+
+    def fetchSources(self,urls,report):
+        # all of a deck's sources are fetched at once. Only the first has to be there, a later one that can't be
+        # read (often an edition with no such article) is left out of the deck
+        if len(urls) == 1:
+            return [self.fetcher.fetch(urls[0], report)]
+        jobs = [sourcePool.submit(self.fetcher.fetch, url, report) for url in urls]
+        pages = [jobs[0].result()]
+        for url, job in zip(urls[1:], jobs[1:]):
+            try:
+                pages.append(job.result())
+            except Exception as e:
+                print(f"Skipping source {url}: {type(e).__name__}: {e}")
+        return pages
+
+    def previousManifest(self,deckFolder,powerpointName):
+        # the last build's manifest, if its deck is still there and was made the same way
+        try:
+            with open(os.path.join(deckFolder, 'manifest.json'), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != manifestVersion or manifest.get('summariser') != type(self.summariser).__name__:
+            return None
+        if manifest.get('imagesPerSlide', 2) != imagesPerSlide:
+            return None
+        return manifest if os.path.exists(powerpointName) else None
+
+    def addNextSlide(self,slides,section,manifest,deckFolder):
+        topicTitle, notes, bulletJob, imagesJob, key = section
+        slideContent = bulletJob.result()
+        images = imagesJob.result()
+        if self.keepArtifacts: # images are only paths, and only worth recording, when they are kept on disk
+            manifest['sections'][topicTitle] = {
+                'hash': key, 'reused': isinstance(bulletJob, CachedResult), 'bullets': slideContent,
+                'images': [[os.path.relpath(path, deckFolder), caption, list(size)] for path, caption, size in images],
+            }
+        slides.append((topicTitle, notes, slideContent, images))
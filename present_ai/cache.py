@@ -0,0 +1,71 @@
+# Completion cache
+
+import hashlib
+import json
+import os
+import time
+
+from .store import SqliteStore, storeLocation, storeMegabytes
+
+class CompletionCache(SqliteStore):
+    # content-addressed SQLite store of completions, evicted by age (TTL) and least-recent use (size cap)
+    table = 'completions'
+    keyColumn = 'key'
+
+    def __init__(self, path, maxBytes=256*1024*1024, ttl=30*24*3600):
+        super().__init__(path, maxBytes, [
+            'CREATE TABLE IF NOT EXISTS completions ('
+            'key TEXT PRIMARY KEY, content TEXT NOT NULL, size INTEGER NOT NULL, '
+            'created REAL NOT NULL, used REAL NOT NULL)',
+            'CREATE INDEX IF NOT EXISTS completions_used ON completions (used)',
+            'CREATE INDEX IF NOT EXISTS completions_created ON completions (created)',
+        ])
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(request):
+        # model, prompts, input text and sampling parameters all live in the request
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.db.execute('SELECT content, created FROM completions WHERE key = ?', (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                self.db.execute('DELETE FROM completions WHERE key = ?', (key,))
+                self.db.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.db.execute('UPDATE completions SET used = ? WHERE key = ?', (now, key))
+            self.db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, content):
+        now = time.time()
+        size = len(content.encode('utf-8'))
+        with self.lock:
+            self.db.execute(
+                'INSERT OR REPLACE INTO completions (key, content, size, created, used) VALUES (?, ?, ?, ?, ?)',
+                (key, content, size, now, now)
+            )
+            self.added(size, now)
+            self.db.commit()
+
+    def expire(self, now):
+        self.db.execute('DELETE FROM completions WHERE created < ?', (now - self.ttl,))
+
+    def stats(self):
+        return f"{self.hits} hits, {self.misses} misses"
+
+def openCompletionCache():
+    path = storeLocation('PRESENT_AI_CACHE', 'completions.sqlite')
+    if path is None:
+        return None
+    maxBytes = storeMegabytes('PRESENT_AI_CACHE_MB', 256)
+    ttl = float(os.environ.get('PRESENT_AI_CACHE_TTL_DAYS', 30)) * 24 * 3600
+    return CompletionCache(path, maxBytes, ttl)
@@ -0,0 +1,110 @@
+# Command line entry point. Only argparse and the settings are loaded up front, everything else is imported by
+# the branch that needs it, so --help and quick runs start fast
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+from .config import defaultLanguage, fetchers, summarisers
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(description='Generate PowerPoint presentations from Wikipedia articles.')
+    parser.add_argument('--batch', metavar='FILE', help="file of topics or Wikipedia URLs, one per line ('-' reads stdin)")
+    parser.add_argument('--language', default=defaultLanguage, help="Wikipedia edition topics are searched and looked up in, e.g. "
+                        f"'de' (default {defaultLanguage}). Topic lines can also pick one ('fr:Dirigeable') or merge several "
+                        "sources into one deck ('en:Airship | de:Luftschiff')")
+    parser.add_argument('--jobs', type=int, default=4, help='decks built in parallel in batch mode (default 4)')
+    parser.add_argument('--summary', default='batch_summary.json', help="where to write the batch JSON summary ('-' for stdout)")
+    parser.add_argument('--output-dir', default='.', help='folder the decks are written to (default: current folder)')
+    parser.add_argument('--output', metavar='PATH', help="write the deck to PATH instead of '<output-dir>/<Topic> Powerpoint.pptx' "
+                        "('-' streams it to stdout, with messages moved to stderr)")
+    parser.add_argument('--keep-artifacts', action='store_true', help="keep each deck's images and manifest in a folder next to it "
+                        '(images are otherwise held in memory only)')
+    parser.add_argument('--report', metavar='PATH', help='write a JSON trace-event report of every stage and print a timing table '
+                        '(in batch mode PATH is a folder with one report per deck)')
+    parser.add_argument('--summariser', choices=summarisers, default=os.environ.get('PRESENT_AI_SUMMARISER', 'openai'),
+                        help="'openai' (default) or 'local' for offline extractive bullets with no API key or cost")
+    parser.add_argument('--fetcher', choices=fetchers, default=os.environ.get('PRESENT_AI_FETCHER', 'rest'),
+                        help="'rest' (default) reads Parsoid HTML from the MediaWiki REST API with caching, 'html' the rendered page")
+    parser.add_argument('--incremental', action='store_true', help='only redo sections whose text or images changed since the '
+                        'deck was last built, and skip the deck entirely if the article has not been edited')
+    parser.add_argument('--serve', metavar='[HOST:]PORT', help='run as a resident service taking deck jobs over HTTP')
+    parser.add_argument('--workers', type=int, default=4, help='decks the service builds at once (default 4)')
+    parser.add_argument('--no-open', action='store_true', help="don't open the finished deck")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parseArgs(argv)
+
+    if args.batch:
+        from .batch import readTopics, runBatch
+        try:
+            summary = runBatch(readTopics(args.batch), args.jobs, args.summary, args.output_dir, args.report, args.summariser,
+                               args.incremental, args.fetcher, args.keep_artifacts, args.language)
+        except ValueError as e:
+            sys.exit(f"Batch not started: {e}")
+        sys.exit(0 if summary['failed'] == 0 else 1)
+
+    if args.serve:
+        import asyncio
+        from .service import DeckService
+        host, _, port = args.serve.rpartition(':')
+        builder = makeBuilder(args, verbose=False)
+        try:
+            asyncio.run(DeckService(builder, args.workers, language=args.language).serve(host or '127.0.0.1', int(port)))
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    if args.output == '-': # stdout carries the deck, so everything printed goes to stderr instead
+        deckStream = sys.stdout.buffer
+        with contextlib.redirect_stdout(sys.stderr):
+            buildOne(args, deckStream)
+        deckStream.flush()
+    elif args.output:
+        with open(args.output, 'wb') as deckStream:
+            buildOne(args, deckStream)
+        if not args.no_open:
+            from .batch import openFile
+            openFile(args.output)
+    else:
+        powerpointName = buildOne(args)
+        if not args.no_open:
+            from .batch import openFile
+            openFile(powerpointName)
+
+def buildOne(args, output=None):
+    from .search import searchWikipedia
+    url,topic,parentFolder = searchWikipedia(args.language)
+    builder = makeBuilder(args)
+    from .report import RunReport
+    report = RunReport() if args.report else None
+
+    print('Generating Powerpoint!')
+    start=time.time()
+    powerpointName = builder.build(url,topic,report,output)
+    end = time.time()
+    print(f'PowerPoint Generated! ({round(end-start, 1)} seconds)')
+    if report is not None:
+        report.write(args.report)
+        print(report.summaryTable())
+        print(f'Report written to {args.report}')
+    if builder.summariser.cache is not None:
+        print(f'Completion cache: {builder.summariser.cache.stats()}')
+    if builder.assets is not None:
+        print(f'Image assets: {builder.assets.stats()}')
+    if getattr(builder.fetcher, 'cache', None) is not None:
+        print(f'Page cache: {builder.fetcher.cache.stats()}')
+    return powerpointName
+
+def makeBuilder(args, verbose=True):
+    from .builder import DeckBuilder
+    from .fetchers import makeFetcher
+    from .net import makeSession
+    from .summarisers import makeSummariser
+    session = makeSession()
+    return DeckBuilder(session=session, summariser=makeSummariser(args.summariser), outputDir=args.output_dir,
+                       verbose=verbose, incremental=args.incremental, fetcher=makeFetcher(args.fetcher, session),
+                       keepArtifacts=args.keep_artifacts)
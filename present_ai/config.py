@@ -0,0 +1,71 @@
+# Settings shared by every module, most of them overridable through PRESENT_AI_* environment variables
+
+import os
+from importlib.util import find_spec
+
+htmlParser = 'lxml' if find_spec('lxml') else 'html.parser' # lxml is a much faster tree builder for BeautifulSoup
+aiWorkers = int(os.environ.get('PRESENT_AI_WORKERS', 8)) # max concurrent OpenAI requests
+aiRetries = int(os.environ.get('PRESENT_AI_RETRIES', 5)) # retries on 429 before giving up
+aiBackoff = 1.0 # seconds, doubled on each retry
+aiRpm = float(os.environ.get('PRESENT_AI_RPM', 3500)) # requests per minute the API key allows (0 for no limit)
+aiTpm = float(os.environ.get('PRESENT_AI_TPM', 200000)) # tokens per minute the API key allows (0 for no limit)
+deckCostCap = float(os.environ.get('PRESENT_AI_DECK_COST_CAP', 0.25)) # dollars of completions per deck (0 for no cap)
+modelPrices = {'gpt-3.5-turbo': (0.50, 1.50)} # dollars per million prompt and completion tokens
+chunkTokens = max(1000, int(os.environ.get('PRESENT_AI_CHUNK_TOKENS', 1500))) # input token budget per bullet request
+sectionsAhead = int(os.environ.get('PRESENT_AI_SECTIONS_AHEAD', 16)) # sections in flight ahead of slide assembly
+keepJobs = 1000 # finished jobs the service remembers
+maxRequestBody = 64*1024 # bytes of a job request the service reads, larger ones are turned away with 413
+keepDecks = int(os.environ.get('PRESENT_AI_KEEP_DECKS', 100)) # finished decks the service holds in memory for download
+manifestVersion = 1 # bump when slide content changes shape, so older manifests are ignored
+headers = {"User-Agent": "Mozilla/5.0"}
+fetchers = ['rest', 'html']
+restPath = '/api/rest_v1/page/html/' # Parsoid HTML endpoint, relative to the wiki's host
+restHeaders = {'Api-User-Agent': 'Present-AI (PowerPoint generator)', 'Accept-Encoding': 'gzip'}
+imageWorkers = int(os.environ.get('PRESENT_AI_IMAGE_WORKERS', 16)) # concurrent image downloads
+imageDpi = int(os.environ.get('PRESENT_AI_IMAGE_DPI', 150)) # resolution images are scaled to on the slide
+normaliseWorkers = int(os.environ.get('PRESENT_AI_NORMALISE_WORKERS', os.cpu_count() or 1)) # images decoded and re-encoded at once
+imagesPerHost = int(os.environ.get('PRESENT_AI_IMAGES_PER_HOST', 6)) # concurrent downloads per host
+imagesPerSlide = max(1, int(os.environ.get('PRESENT_AI_IMAGES_PER_SLIDE', 2))) # pictures stacked beside the text
+sourceWorkers = int(os.environ.get('PRESENT_AI_SOURCE_WORKERS', 8)) # article sources fetched and parsed at once
+defaultLanguage = os.environ.get('PRESENT_AI_LANGUAGE', 'en') # Wikipedia edition that bare topic names are looked up in
+
+summarisers = ['openai', 'local']
+unspacedLanguages = {'ja', 'zh'} # written without spaces between words
+stopWords = set('''a an and are as at be been but by for from had has have he her his in into is it its of on or
+that the their them they this to was were which who will with not also after before than then there these those
+such can could would may one two about over under between during while where when'''.split())
+
+avoidedContents = ['Citations','Notes','See also','Sources','Further reading','External links','Gallery','Bibliography','Works cited','Collaborators','References','References 2']
+# the same kind of sections in other language editions, skipped on top of the English ones
+localAvoidedContents = {
+    'de': ['Literatur','Weblinks','Einzelnachweise','Anmerkungen','Siehe auch','Quellen','Galerie'],
+    'fr': ['Notes et références','Notes','Références','Voir aussi','Articles connexes','Bibliographie','Liens externes','Galerie'],
+    'es': ['Referencias','Notas','Véase también','Bibliografía','Enlaces externos','Galería'],
+    'it': ['Note','Bibliografia','Voci correlate','Altri progetti','Collegamenti esterni','Galleria d\'immagini'],
+    'pt': ['Referências','Notas','Ver também','Bibliografia','Ligações externas','Galeria'],
+    'nl': ['Bronnen','Noten','Referenties','Zie ook','Literatuur','Externe links','Externe link'],
+    'pl': ['Przypisy','Bibliografia','Zobacz też','Linki zewnętrzne','Uwagi'],
+    'sv': ['Referenser','Noter','Källor','Se även','Externa länkar','Vidare läsning'],
+    'ja': ['脚注','出典','注釈','参考文献','関連項目','外部リンク'],
+}
+# sections holding the reference list that goes on the last slide
+referenceSections = ['References','References 2','Einzelnachweise','Notes et références','Références','Referencias','Note',
+                     'Referências','Bronnen','Referenties','Przypisy','Referenser','Källor','脚注','出典']
+avoidedImages = [
+    'Question_book-new.svg',
+    'Nuvola_apps_kaboodle.svg',
+    'Ambox_current_red_Asia_Australia.svg',
+    'Information_icon4.svg',
+    'Climate_change_icon',
+    'Symbol_list_class.svg',
+    'Ambox_rewrite.svg',
+    'Ambox_important.svg',
+    'Wiki_letter_w_cropped.svg',
+    'Commons-logo.svg',
+    'Wikibooks-logo-en-noslogan.svg',
+    'Semi-protection-shackle-keyhole.svg',
+    'Wiki_letter_w.svg',
+    'Red_flag_II.svg',
+    'A_coloured_voting_box.svg',
+    'Symbol-hammer-and-sickle.svg',
+    '40px']
@@ -0,0 +1,266 @@
+# Where article HTML comes from: the MediaWiki REST API, the rendered page, or a stub
+
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, unquote, urlsplit
+
+from .config import defaultLanguage, fetchers, imagesPerHost, restHeaders, restPath
+from .net import hostLimit, makeSession
+from .report import span
+from .store import SqliteStore, storeLocation, storeMegabytes
+
+class PageFetcher:
+    # where article HTML comes from. fetch returns {'url', 'html', 'revision', 'source'}, and prefetch lets a
+    # fetcher get ready for many articles at once (nothing to do unless the fetcher can batch)
+
+    def fetch(self, url, report=None):
+        raise NotImplementedError
+
+    def prefetch(self, urls, report=None):
+        pass
+
+class HtmlFetcher(PageFetcher):
+    # the rendered article page, skin and all, as a browser gets it
+
+    def __init__(self, session=None):
+        self.session = session or makeSession()
+
+    def fetch(self, url, report=None):
+        with span(report, 'page.fetch', url=url, source='network') as info:
+            response = self.session.get(url, timeout=(5, 30))
+            response.raise_for_status()
+            info['bytes'] = len(response.content)
+        return {'url': url, 'html': response.text, 'revision': pageRevision(response.text), 'source': 'network'}
+
+class RestFetcher(PageFetcher):
+    # Parsoid HTML from the MediaWiki REST API: split into <section>s, no skin chrome, gzipped on the wire and
+    # tagged with its revision id. Pages are kept in a PageCache and revalidated with If-None-Match. URLs
+    # that aren't /wiki/ articles fall back to the rendered page
+
+    def __init__(self, session=None, cache=None):
+        self.session = session or makeSession()
+        self.cache = cache if cache is not None else openPageCache()
+        self.html = HtmlFetcher(self.session)
+
+    def fetch(self, url, report=None):
+        apiUrl = restUrl(url)
+        if apiUrl is None:
+            return self.html.fetch(url, report)
+
+        entry = self.cache.get(apiUrl) if self.cache is not None else None
+        if entry and entry['fresh']:
+            with span(report, 'page.fetch', url=apiUrl, source='cache', bytes=0):
+                return {'url': url, 'html': entry['html'], 'revision': entry['revision'], 'source': 'cache'}
+
+        conditional = {'If-None-Match': entry['etag']} if entry and entry['etag'] else {}
+        with hostLimit(apiUrl), span(report, 'page.fetch', url=apiUrl, source='network') as info:
+            response = self.session.get(apiUrl, headers={**restHeaders, **conditional}, timeout=(5, 30))
+            if entry and response.status_code == 304:
+                info.update(source='revalidated', bytes=0)
+                self.cache.touch(apiUrl)
+                return {'url': url, 'html': entry['html'], 'revision': entry['revision'], 'source': 'revalidated'}
+            response.raise_for_status()
+            info.update(bytes=len(response.content), encoding=response.headers.get('Content-Encoding'))
+
+        revision = etagRevision(response.headers.get('ETag')) or pageRevision(response.text)
+        if self.cache is not None:
+            self.cache.put(apiUrl, response.text, revision, response.headers.get('ETag'))
+        return {'url': url, 'html': response.text, 'revision': revision, 'source': 'network'}
+
+    def prefetch(self, urls, report=None):
+        # asks the action API for the current revision of up to 50 titles per request. Cached pages still at
+        # that revision are marked fresh, the others are fetched now, so later fetch calls (in this process
+        # or any other sharing the cache) need no request at all
+        if self.cache is None:
+            return
+        byHost = {}
+        for url in urls:
+            apiUrl = restUrl(url)
+            if apiUrl is not None:
+                parts = urlsplit(url)
+                title = unquote(parts.path[len('/wiki/'):]).replace('_', ' ')
+                byHost.setdefault((parts.scheme, parts.netloc), {})[title] = (url, apiUrl)
+
+        stale = []
+        for (scheme, host), titles in byHost.items():
+            names = list(titles)
+            for start in range(0, len(names), 50):
+                batch = names[start:start+50]
+                try:
+                    current = self.revisions(f'{scheme}://{host}/w/api.php', batch, report)
+                except Exception as e:
+                    print(f"Revision lookup failed on {host}: {e}")
+                    current = {}
+                for title in batch:
+                    url, apiUrl = titles[title]
+                    entry = self.cache.get(apiUrl)
+                    if entry and current.get(title) == entry['revision']:
+                        self.cache.touch(apiUrl)
+                    else:
+                        stale.append(url)
+
+        with ThreadPoolExecutor(max_workers=imagesPerHost) as pool:
+            for url, job in [(url, pool.submit(self.fetch, url, report)) for url in stale]:
+                try:
+                    job.result()
+                except Exception as e:
+                    print(f"Prefetch of {url} failed: {e}") # the build of that deck will report it properly
+
+    def revisions(self, apiUrl, titles, report=None):
+        # {requested title: current revision id}, following normalisation and redirects
+        with span(report, 'page.revisions', url=apiUrl, titles=len(titles)):
+            response = self.session.get(apiUrl, headers=restHeaders, timeout=(5, 30), params={
+                'action': 'query', 'prop': 'revisions', 'rvprop': 'ids', 'redirects': 1,
+                'titles': '|'.join(titles), 'format': 'json', 'formatversion': 2})
+            response.raise_for_status()
+            query = response.json().get('query', {})
+
+        renamed = {item['from']: item['to'] for item in query.get('normalized', []) + query.get('redirects', [])}
+        current = {page['title']: page['revisions'][0]['revid'] for page in query.get('pages', []) if page.get('revisions')}
+        revisions = {}
+        for title in titles:
+            name = title
+            while name in renamed and renamed[name] != name:
+                name = renamed[name]
+            if name in current:
+                revisions[title] = current[name]
+        return revisions
+
+class StubFetcher(PageFetcher):
+    # pages from memory or disk, for tests and offline runs. pages maps an article URL or title to its HTML
+    # or to a file holding it
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def fetch(self, url, report=None):
+        with span(report, 'page.fetch', url=url, source='stub'):
+            html = self.pages.get(url) or self.pages.get(topicFromLine(url)[1])
+            if html is None:
+                raise KeyError(f"no stub page for {url}")
+            if '<' not in html and os.path.exists(html):
+                with open(html, encoding='utf-8') as f:
+                    html = f.read()
+        return {'url': url, 'html': html, 'revision': pageRevision(html), 'source': 'stub'}
+
+def restUrl(url):
+    # https://<host>/wiki/<Title> -> that wiki's REST endpoint for the Parsoid HTML of <Title>
+    parts = urlsplit(url)
+    if not parts.path.startswith('/wiki/') or len(parts.path) <= len('/wiki/'):
+        return None
+    title = quote(unquote(parts.path[len('/wiki/'):]).replace(' ', '_'), safe='')
+    return f"{parts.scheme}://{parts.netloc}{restPath}{title}?redirect=true"
+
+def pageRevision(html):
+    # rendered pages carry the revision in their config script, Parsoid HTML in the document's about link
+    match = re.search(r'"wgRevisionId":\s*(\d+)|Special:Redirect/revision/(\d+)', html)
+    return int(match.group(1) or match.group(2)) if match else None
+
+def etagRevision(etag):
+    # REST API ETags look like W/"<revision>/<render id>"
+    match = re.match(r'(?:W/)?"(\d+)/', etag or '')
+    return int(match.group(1)) if match else None
+
+def makeFetcher(name, session=None):
+    if name == 'rest':
+        return RestFetcher(session)
+    if name == 'html':
+        return HtmlFetcher(session)
+    raise ValueError(f"unknown fetcher {name!r}, expected one of {fetchers}")
+
+def topicFromLine(line,language=None):
+    # a line is a Wikipedia article URL, a topic name in the default edition, or a topic with its edition's
+    # prefix ('de:Luftschiff')
+    if line.startswith('http://') or line.startswith('https://'):
+        topic = unquote(urlsplit(line).path.rstrip('/').rsplit('/', 1)[-1]).replace('_',' ')
+        return line, topic
+    prefixed = re.match(r'([a-z]{2,3}(?:-[a-z]+)*):(\S.*)', line)
+    if prefixed:
+        language, line = prefixed.groups()
+    return f"https://{language or defaultLanguage}.wikipedia.org/wiki/"+line.replace(' ','_'), line
+
+def sourcesFromLine(line,language=None):
+    # several sources for one deck are separated by ' | ' ('en:Airship | de:Luftschiff'). Returns (url, topic)
+    # with url a list when there is more than one source, and the topic of the first
+    sources = [topicFromLine(part.strip(), language) for part in line.split(' | ') if part.strip()]
+    if len(sources) == 1:
+        return sources[0]
+    return [url for url, topic in sources], sources[0][1]
+
+def wikiLanguage(url):
+    # the language edition a Wikipedia URL belongs to ('de' for de.wikipedia.org), the default one for other sites
+    host = (urlsplit(url).hostname or '').split('.')
+    if len(host) >= 3 and host[-2:] == ['wikipedia', 'org'] and host[0] not in ('www', 'm'):
+        return host[0]
+    return defaultLanguage
+
+def deckName(url,topic):
+    # what a deck and its files are called: its topic, tagged with the language editions it comes from unless
+    # that is just the default one, so 'de:Paris' and 'fr:Paris' don't overwrite each other
+    languages = list(dict.fromkeys(wikiLanguage(source) for source in ([url] if isinstance(url, str) else url)))
+    return topic if languages == [defaultLanguage] else f"{topic} ({'+'.join(languages)})"
+
+class PageCache(SqliteStore):
+    # SQLite store of fetched article HTML (compressed) with the ETag and revision to revalidate it by.
+    # A page checked less than freshFor seconds ago is used without asking the server
+    table = 'pages'
+    keyColumn = 'url'
+
+    def __init__(self, path, maxBytes=256*1024*1024, freshFor=600):
+        super().__init__(path, maxBytes, [
+            'CREATE TABLE IF NOT EXISTS pages ('
+            'url TEXT PRIMARY KEY, html BLOB NOT NULL, revision INTEGER, etag TEXT, size INTEGER NOT NULL, '
+            'checked REAL NOT NULL, used REAL NOT NULL)',
+            'CREATE INDEX IF NOT EXISTS pages_used ON pages (used)',
+        ])
+        self.freshFor = freshFor
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def get(self, url):
+        now = time.time()
+        with self.lock:
+            row = self.db.execute('SELECT html, revision, etag, checked FROM pages WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                return None
+            self.db.execute('UPDATE pages SET used = ? WHERE url = ?', (now, url))
+            self.db.commit()
+            fresh = now - row[3] < self.freshFor
+            if fresh:
+                self.hits += 1
+        return {'html': zlib.decompress(row[0]).decode('utf-8'), 'revision': row[1], 'etag': row[2], 'fresh': fresh}
+
+    def put(self, url, html, revision, etag):
+        # every page stored came over the network, new or replacing a stale one
+        now = time.time()
+        data = zlib.compress(html.encode('utf-8'), 6)
+        with self.lock:
+            self.db.execute(
+                'INSERT OR REPLACE INTO pages (url, html, revision, etag, size, checked, used) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, data, revision, etag, len(data), now, now)
+            )
+            self.added(len(data), now)
+            self.db.commit()
+            self.misses += 1
+
+    def touch(self, url):
+        # the server (or a revision lookup) confirmed the stored page is still current
+        with self.lock:
+            self.db.execute('UPDATE pages SET checked = ? WHERE url = ?', (time.time(), url))
+            self.db.commit()
+            self.revalidated += 1
+
+    def stats(self):
+        return f"{self.hits} fresh, {self.revalidated} revalidated, {self.misses} fetched"
+
+def openPageCache():
+    path = storeLocation('PRESENT_AI_PAGES', 'pages.sqlite')
+    if path is None:
+        return None
+    maxBytes = storeMegabytes('PRESENT_AI_PAGES_MB', 256)
+    freshFor = float(os.environ.get('PRESENT_AI_PAGES_FRESH_MINUTES', 10)) * 60
+    return PageCache(path, maxBytes, freshFor)
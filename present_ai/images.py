@@ -0,0 +1,162 @@
+# Downloading, normalising and placing images
+
+import hashlib
+import io
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from PIL import Image
+
+from .config import imageDpi, imageWorkers, normaliseWorkers
+from .net import hostLimit
+from .report import span
+
+imagePool = ThreadPoolExecutor(max_workers=imageWorkers) # shared by every deck in the process
+# Pillow work is CPU bound: more images at once than CPUs only time-slice them and hold more decoded images
+normaliseSlots = threading.BoundedSemaphore(normaliseWorkers)
+
+def downloadImage(link,session,assets=None,report=None):
+    # returns (source hash, image bytes or a file in the asset store, extension, pixel size)
+    entry = assets.lookup(link) if assets is not None else None
+    if entry and entry['fresh']:
+        with span(report, 'image.fetch', url=link, source='store', bytes=0):
+            return assets.reuse(link, entry)
+
+    conditional = {}
+    if entry and entry['etag']:
+        conditional['If-None-Match'] = entry['etag']
+    if entry and entry['modified']:
+        conditional['If-Modified-Since'] = entry['modified']
+
+    with hostLimit(link), span(report, 'image.fetch', url=link, source='network') as info:
+        r = session.get(link, headers=conditional, timeout=(5, 12))
+        if entry and r.status_code == 304:
+            info.update(source='revalidated', bytes=0)
+            return assets.reuse(link, entry, revalidated=True)
+        r.raise_for_status()
+        data = r.content
+        info['bytes'] = len(data)
+
+    with normaliseSlots, span(report, 'image.normalise', url=link) as info:
+        digest, data, ext, size = normaliseImage(data)
+        info['bytes'] = len(data)
+    if assets is not None:
+        data = assets.store(link, digest, data, ext, size, r.headers.get('ETag'), r.headers.get('Last-Modified'))
+    return digest, data, ext, size
+
+def placeImage(data,localPath):
+    # bytes are written out, asset store files are hardlinked into the deck (copied across filesystems)
+    if isinstance(data, bytes):
+        with open(localPath, 'wb') as f:
+            f.write(data)
+        return
+    if os.path.exists(localPath):
+        os.remove(localPath)
+    try:
+        os.link(data, localPath)
+    except OSError:
+        shutil.copyfile(data, localPath)
+
+def normaliseImage(data,maxWidth=4.5,maxHeight=5.5):
+    # sniff the real format, rasterise SVGs, shrink to what the image box shows at imageDpi and
+    # re-encode as PNG or JPEG. Returns (hash of the source bytes, image bytes, extension, pixel size)
+    digest = hashlib.sha256(data).hexdigest()
+    maxPixels = (int(maxWidth*imageDpi), int(maxHeight*imageDpi))
+
+    if b'<svg' in data[:1024]:
+        cairosvg = svgRasteriser()
+        if cairosvg is None:
+            raise ValueError("SVG image and cairosvg is not installed")
+        data = cairosvg.svg2png(bytestring=data, output_width=maxPixels[0])
+
+    image = Image.open(io.BytesIO(data)) # raises for anything Pillow can't identify
+    sourceFormat = image.format
+    if sourceFormat == 'JPEG':
+        image.draft('RGB', maxPixels) # let the decoder skip detail we would throw away
+    image.load()
+
+    if sourceFormat in ('JPEG', 'PNG') and image.width <= maxPixels[0] and image.height <= maxPixels[1]:
+        return digest, data, '.jpg' if sourceFormat == 'JPEG' else '.png', image.size
+
+    image.thumbnail(maxPixels, Image.LANCZOS) # first frame only for animations
+    hasAlpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    out = io.BytesIO()
+    if sourceFormat == 'JPEG' or (sourceFormat not in ('PNG', 'GIF') and not hasAlpha):
+        image.convert('RGB').save(out, 'JPEG', quality=85, optimize=True)
+        ext = '.jpg'
+    else:
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+            image = image.convert('RGBA' if hasAlpha else 'RGB')
+        image.save(out, 'PNG', optimize=True)
+        ext = '.png'
+    return digest, out.getvalue(), ext, image.size
+
+class DeckImages:
+    # one deck's images by source hash, so a picture used on several slides is stored once. They are held in
+    # memory unless folder is given, in which case they are written under it as artifacts kept after the build
+
+    def __init__(self, folder=None):
+        self.folder = folder
+        self.images = {}
+
+    def add(self, digest, section, name, data, size):
+        # returns (image, size): image is the bytes, or the file's path when kept on disk
+        if digest in self.images:
+            return self.images[digest]
+        if self.folder is None:
+            if not isinstance(data, bytes): # a file in the asset store, read now so eviction can't pull it away
+                with open(data, 'rb') as f:
+                    data = f.read()
+            return self.images.setdefault(digest, (data, size))
+        localPath = os.path.join(self.folder, section.replace(' ', '_'), name)
+        stored = self.images.setdefault(digest, (localPath, size))
+        if stored[0] == localPath: # first time this deck has seen the image
+            os.makedirs(os.path.dirname(localPath), exist_ok=True)
+            placeImage(data, localPath)
+        return stored
+
+def downloadImages(imageCandidates,session,deckImages,assets=None,report=None,maxImages=2):
+    # imageCandidates holds (section title, [(link, caption), ...]) per section. Each round downloads
+    # the next candidates for every section still short of maxImages, all sections at once, into deckImages
+    saved = [{} for _ in imageCandidates]
+    tried = [0]*len(imageCandidates)
+    digests = [set() for _ in imageCandidates]
+
+    while True:
+        jobs = []
+        for i, (section, candidates) in enumerate(imageCandidates):
+            needed = maxImages - len(saved[i])
+            for index in range(tried[i], min(tried[i]+needed, len(candidates))):
+                link, cap = candidates[index]
+                jobs.append((i, index, link, imagePool.submit(downloadImage, link, session, assets, report)))
+            tried[i] = min(tried[i]+max(needed, 0), len(candidates))
+        if not jobs:
+            break
+
+        for i, index, link, job in jobs:
+            section, candidates = imageCandidates[i]
+            try:
+                digest, data, ext, size = job.result()
+            except Exception as e:
+                print(f"Failed to save {link}: {e}")
+                continue # next round tries the section's next image tag
+            if digest in digests[i]:
+                continue # same picture twice on one slide, try the next one instead
+            digests[i].add(digest)
+
+            image, size = deckImages.add(digest, section, f"img{index}_{digest[:12]}{ext}", data, size)
+            saved[i][index] = (image, candidates[index][1], size)
+
+    return [[images[index] for index in sorted(images)] for images in saved]
+
+@lru_cache(maxsize=1)
+def svgRasteriser():
+    # optional, lets SVG images be rasterised instead of skipped
+    try:
+        import cairosvg
+        return cairosvg
+    except (ImportError, OSError): # OSError when the cairo library itself is missing
+        return None
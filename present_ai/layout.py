@@ -0,0 +1,107 @@
+# Slide geometry as plain data, computed before anything is drawn
+
+from functools import lru_cache
+
+def layoutSlides(slides):
+    # one pass over every content slide of a deck, turning (title, notes, bullets, images) into plain data with
+    # all geometry in inches: the text box and its fitted font size, then a box per picture and per caption.
+    # Nothing here touches pptx, so layouts are cheap, deterministic and can be kept or compared as they are
+    layouts = []
+    leftText = True
+    for title, notes, slideContent, images in slides:
+        bullets = [line.lstrip('- ') for line in slideContent.split('\n')]
+        if images: # text and pictures swap sides from one picture slide to the next
+            leftText = not leftText
+            textBox = (0.5, 1.75, 4.42, 4.95) if leftText else (5.08, 1.75, 4.42, 4.95)
+            fontSize = fitFontSize(bullets, textBox[2], textBox[3], largest=22, smallest=10)
+            pictures, captions = layoutImages(images, 5.0 if leftText else 0.5)
+        else:
+            textBox = (0.5, 1.75, 9.0, 4.95)
+            fontSize = fitFontSize(bullets, textBox[2], textBox[3], largest=28, smallest=12)
+            pictures, captions = [], []
+        layouts.append({'title': title, 'notes': notes, 'bullets': bullets, 'fontSize': fontSize, 'textBox': textBox,
+                        'pictures': pictures, 'captions': captions})
+    return layouts
+
+def layoutImages(images,left,top=1.5,width=4.5,height=5.5,gap=0.2):
+    # stacks any number of pictures in the image area, each in an equal slot with its caption under it
+    slot = (height - gap*(len(images)-1)) / len(images)
+    captionSize = 10 if len(images) == 1 else 8
+    pictures, captions = [], []
+
+    for i, (image, caption, size) in enumerate(images):
+        slotTop = top + i*(slot + gap)
+        captionHeight = min(slot/3, textHeight([caption], width, captionSize, indent=0)) if caption else 0
+        captionGap = 0.1 if caption else 0
+        imageWidth, imageHeight, widthLost, heightLost = getImageSize(size, maxWidth=width, maxHeight=slot - captionHeight - captionGap)
+
+        imageTop = slotTop + (slot - imageHeight - captionGap - captionHeight)/2 # picture and caption centred together
+        pictures.append({'image': image, 'box': (left + widthLost/2, imageTop, imageWidth, imageHeight)})
+        if caption:
+            captions.append({'text': caption, 'fontSize': captionSize,
+                             'box': (left, imageTop + imageHeight + captionGap, width, captionHeight)})
+    return pictures, captions
+
+def fitFontSize(bullets,width,height,largest,smallest):
+    # the largest whole point size at which the bullets, wrapped to the box, fit in it
+    for size in range(largest, smallest, -1):
+        if textHeight(bullets, width, size) <= height:
+            return size
+    return smallest
+
+def textHeight(paragraphs,width,size,indent=0.375):
+    # inches the paragraphs take once wrapped at this size: body text insets 0.1" each side plus the bullet
+    # indent, lines are 1.2 em apart and the master adds 20% of a line before each paragraph
+    usable = (width - 0.2 - indent) * 72 / size # line width in ems
+    space = textEms(' ')
+    lines = 0
+    for paragraph in paragraphs:
+        lines += 0.2 # the space before it
+        line = None
+        for word in paragraph.split() or ['']:
+            length = textEms(word)
+            if line is not None and line + space + length <= usable:
+                line += space + length
+            else:
+                lines += 1 + (int(length // usable) if usable > 0 else 0) # a word wider than the box breaks
+                line = length % usable if usable > 0 and length > usable else length
+    return lines * 1.2 * size / 72 + 0.1 # plus top and bottom insets
+
+@lru_cache(maxsize=65536)
+def textEms(text):
+    # width of text in ems, measured with Pillow's bundled sans font whose widths are close to Calibri's
+    font = measureFont()
+    return font.getlength(text) / 100 if font is not None else 0.5 * len(text)
+
+@lru_cache(maxsize=1)
+def measureFont():
+    from PIL import ImageFont
+    try:
+        return ImageFont.load_default(100)
+    except (TypeError, OSError, ImportError): # Pillow older than 10.1 or built without FreeType
+        return None
+
+def getImageSize(size, maxWidth=4.5, maxHeight=5.5):
+    imWidth, imHeight = size # pixel size recorded when the image was normalised
+    dimensions = imWidth/imHeight
+    maxDimension = maxWidth/maxHeight
+    
+    if dimensions > maxDimension: # Landscape ratio or wider
+        width = maxWidth
+        height = maxWidth * (1 / dimensions)
+    else: # Portrait ratio or taller
+        height = maxHeight
+        width = maxHeight * dimensions
+        
+    # Recalculate if constrained in one dimension due to the other's limit
+    if width > maxWidth:
+        width = maxWidth
+        height = maxWidth * (1 / dimensions)
+    if height > maxHeight:
+        height = maxHeight
+        width = maxHeight * dimensions
+    
+    heightLost = maxHeight - height
+    widthLost = maxWidth - width
+    
+    return width, height, widthLost, heightLost
@@ -0,0 +1,45 @@
+# Per-deck manifest for incremental rebuilds
+
+import hashlib
+import json
+import os
+from concurrent.futures import Future
+
+def sectionHash(body,candidates):
+    # a section needs rebuilding when its text or any of its image links or captions change
+    digest = hashlib.sha256(body.encode('utf-8'))
+    for link, caption in candidates:
+        digest.update(f"\0{link}\0{caption}".encode('utf-8'))
+    return digest.hexdigest()
+
+def reusableSection(previous,title,key,deckFolder):
+    # (bullets, images) saved for an unchanged section whose image files are still on disk, or None
+    section = previous['sections'].get(title) if previous else None
+    if not section or section['hash'] != key:
+        return None
+    images = [(os.path.join(deckFolder, path), caption, tuple(size)) for path, caption, size in section['images']]
+    if not all(os.path.exists(path) for path, caption, size in images):
+        return None
+    return section['bullets'], images
+
+class CachedResult(Future):
+    # an already finished job, so reused sections go through the same slide assembly as fresh ones
+    def __init__(self, value):
+        super().__init__()
+        self.set_result(value)
+
+def writeManifest(deckFolder,manifest):
+    # written next to the deck once it is saved, then image files no section uses any more are removed. The
+    # folder is only there already if one of the deck's images was saved
+    os.makedirs(deckFolder, exist_ok=True)
+    path = os.path.join(deckFolder, 'manifest.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+    used = {os.path.normcase(os.path.join(deckFolder, image[0])) for section in manifest['sections'].values() for image in section['images']}
+    for folder, subfolders, files in os.walk(deckFolder):
+        for name in files:
+            path = os.path.join(folder, name)
+            if folder != deckFolder and name.startswith('img') and os.path.normcase(path) not in used:
+                os.remove(path)
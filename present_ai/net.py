@@ -0,0 +1,30 @@
+# The pooled HTTP session and per-host download limits
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import headers, imageWorkers, imagesPerHost
+
+hostLimits = {}
+hostLimitsLock = threading.Lock()
+
+def makeSession():
+    # one pooled session so every request reuses kept-alive connections
+    session = requests.Session()
+    session.headers.update(headers)
+    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET', 'HEAD'])
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=imageWorkers, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def hostLimit(link):
+    host = urlsplit(link).netloc
+    with hostLimitsLock:
+        if host not in hostLimits:
+            hostLimits[host] = threading.BoundedSemaphore(imagesPerHost)
+        return hostLimits[host]
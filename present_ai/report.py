@@ -0,0 +1,83 @@
+# Timed spans for a run, written out as Chrome trace events
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+class RunReport:
+    # timed spans for one deck, written out as Chrome trace events (chrome://tracing, Perfetto) plus a summary table
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.threads = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, **args):
+        start = time.perf_counter()
+        try:
+            yield args # callers add sizes, tokens and retries as they learn them
+        except BaseException as e:
+            args['error'] = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                thread = self.threads.setdefault(threading.get_ident(), len(self.threads))
+                self.events.append((stage, start - self.origin, end - start, thread, args))
+
+    def stages(self):
+        # per stage: count, total/p50/p95/max seconds and summed bytes, tokens, retries, scheduler waits and cost
+        grouped = {}
+        for stage, start, duration, thread, args in self.events:
+            grouped.setdefault(stage, []).append((duration, args))
+
+        stages = {}
+        for stage, spans in grouped.items():
+            durations = sorted(duration for duration, args in spans)
+            totals = {'count': len(spans), 'seconds': round(sum(durations), 4),
+                      'p50': round(percentile(durations, 50), 4), 'p95': round(percentile(durations, 95), 4),
+                      'max': round(durations[-1], 4)}
+            for field in ('bytes', 'prompt_tokens', 'completion_tokens', 'retries'):
+                values = [args[field] for duration, args in spans if isinstance(args.get(field), int)]
+                if values:
+                    totals[field] = sum(values)
+            for field in ('queued', 'cost'):
+                values = [args[field] for duration, args in spans if isinstance(args.get(field), float)]
+                if values:
+                    totals[field] = round(sum(values), 6)
+            stages[stage] = totals
+        return stages
+
+    def traceEvents(self):
+        return [
+            {'name': stage, 'cat': stage.split('.')[0], 'ph': 'X', 'ts': round(start*1e6), 'dur': round(duration*1e6),
+             'pid': os.getpid(), 'tid': thread, 'args': args}
+            for stage, start, duration, thread, args in self.events
+        ]
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.traceEvents(), 'stages': self.stages(), 'displayTimeUnit': 'ms'}, f, default=str)
+
+    def summaryTable(self):
+        lines = [f"{'stage':<16}{'count':>7}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'bytes':>12}{'tokens':>10}{'retries':>9}"]
+        for stage, totals in sorted(self.stages().items(), key=lambda item: -item[1]['seconds']):
+            tokens = totals.get('prompt_tokens', 0) + totals.get('completion_tokens', 0)
+            lines.append(
+                f"{stage:<16}{totals['count']:>7}{totals['seconds']:>10.2f}{totals['p50']*1000:>10.0f}{totals['p95']*1000:>10.0f}"
+                f"{totals['max']*1000:>10.0f}{totals.get('bytes', ''):>12}{tokens or '':>10}{totals.get('retries', ''):>9}"
+            )
+        return '\n'.join(lines)
+
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered)-1, round(q/100 * (len(ordered)-1)))]
+
+def span(report, stage, **args):
+    # a report span, or a no-op one when the run isn't being measured
+    return report.span(stage, **args) if report is not None else nullcontext(args)
@@ -0,0 +1,158 @@
+# Rate limits and budgets for completion requests: one scheduler per process, one budget per deck
+
+import heapq
+import itertools
+import threading
+import time
+from functools import lru_cache
+
+from .config import aiRpm, aiTpm
+
+class TokenBucket:
+    # refills at perMinute/60 a second, holding at most burst seconds' worth. A take larger than the whole
+    # bucket goes through once the bucket is full and leaves it in debt, so the next takers wait it off
+
+    def __init__(self, perMinute, burst=2.0):
+        self.perMinute = perMinute
+        self.burst = burst
+        self.factor = 1.0 # share of the limit in use, lowered while the API is pushing back
+        self.level = self.capacity()
+        self.updated = time.monotonic()
+
+    def rate(self):
+        return self.perMinute / 60 * self.factor
+
+    def capacity(self):
+        return max(1.0, self.rate() * self.burst)
+
+    def refill(self, now):
+        self.level = min(self.capacity(), self.level + (now - self.updated) * self.rate())
+        self.updated = now
+
+    def wait(self, amount, now):
+        # seconds until amount can be taken, 0 if it can be taken now
+        if not self.perMinute:
+            return 0
+        self.refill(now)
+        missing = min(amount, self.capacity()) - self.level
+        return missing / self.rate() if missing > 0 else 0
+
+    def take(self, amount):
+        if self.perMinute:
+            self.level -= amount
+
+    def scale(self, factor, now):
+        self.refill(now)
+        self.factor = factor
+        self.level = min(self.level, self.capacity())
+
+class LLMScheduler:
+    # every completion request in the process waits its turn here. Requests go out in priority order (lowest
+    # first, then first come) as fast as the requests- and tokens-per-minute buckets allow. A 429 pauses every
+    # request and slows the buckets by a quarter, and each success speeds them back up towards the limits, so
+    # the process settles at the fastest rate the API sustains
+
+    def __init__(self, rpm=0, tpm=0):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.share = 1.0 # this process's part of the limits, when several processes share one key
+        self.speed = 1.0
+        self.resumeAt = 0.0
+        self.waiting = [] # heap of (priority, arrival) tickets
+        self.arrivals = itertools.count()
+        self.changed = threading.Condition()
+        self.sent = 0
+        self.limited = 0
+
+    def acquire(self, priority, tokens):
+        # blocks until a request of about this many tokens may be sent, returns the seconds it waited
+        start = time.monotonic()
+        ticket = (priority, next(self.arrivals))
+        with self.changed:
+            heapq.heappush(self.waiting, ticket)
+            self.changed.notify_all() # the head of the line may have changed
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = None
+                    if self.waiting[0] == ticket:
+                        delay = max(self.resumeAt - now, self.requests.wait(1, now), self.tokens.wait(tokens, now))
+                        if delay <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            self.sent += 1
+                            return now - start
+                    self.changed.wait(delay)
+            finally:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                self.changed.notify_all()
+
+    def throttle(self, delay):
+        # the API answered 429: nobody sends for delay seconds, and the rate drops by a quarter
+        with self.changed:
+            self.limited += 1
+            self.resumeAt = max(self.resumeAt, time.monotonic() + delay)
+            self.setSpeed(max(0.1, self.speed * 0.75))
+
+    def succeeded(self):
+        if self.speed < 1:
+            with self.changed:
+                self.setSpeed(min(1.0, self.speed + 0.02))
+
+    def setShare(self, share):
+        with self.changed:
+            self.share = share
+            self.setSpeed(self.speed)
+
+    def setSpeed(self, speed):
+        # callers hold the lock
+        self.speed = speed
+        now = time.monotonic()
+        for bucket in (self.requests, self.tokens):
+            bucket.scale(self.share * speed, now)
+        self.changed.notify_all()
+
+    def stats(self):
+        return f"{self.sent} sent, {self.limited} rate limited, running at {self.speed:.0%} of the limits"
+
+@lru_cache(maxsize=1)
+def llmScheduler():
+    # shared by every deck and thread in the process
+    return LLMScheduler(aiRpm, aiTpm)
+
+class BudgetExceeded(Exception):
+    pass
+
+class DeckBudget:
+    # the dollars one deck may spend on completions. A request reserves its worst case (whole prompt plus
+    # max_tokens) before it is sent and settles at its real cost after, and one that could take the deck over
+    # the cap is refused. Summarisers start cutting back well before that: captions past captionsOffAt of the
+    # cap, long inputs past shortInputsAt
+    captionsOffAt = 0.6
+    shortInputsAt = 0.8
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.spent = 0.0
+        self.reserved = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self, cost):
+        with self.lock:
+            if self.spent + self.reserved + cost > self.cap:
+                return False
+            self.reserved += cost
+            return True
+
+    def settle(self, reserved, cost):
+        with self.lock:
+            self.reserved -= reserved
+            self.spent += cost
+
+    def used(self):
+        # share of the cap spent or promised to requests in flight
+        return (self.spent + self.reserved) / self.cap
+
+    def stats(self):
+        return f"${self.spent:.4f} of ${self.cap:.2f}"
@@ -0,0 +1,162 @@
+# Splitting an article into sections, and reading text, images and references out of them
+
+import hashlib
+import os
+import re
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from .config import avoidedContents, avoidedImages, htmlParser, localAvoidedContents, referenceSections
+from .fetchers import wikiLanguage
+from .report import span
+
+def articleSections(page,report=None):
+    # reads a fetched page into ('section', title, text, image candidates) per content section and
+    # ('references', title, reference list, []) per reference section, skipping the other boilerplate
+    # sections of the page's language edition
+    avoided = set(avoidedContents).union(localAvoidedContents.get(wikiLanguage(page['url']), []))
+    for title, nodes in parseSections(page['html'],report):
+        if title not in avoided:
+            with span(report, 'section.parse', title=title):
+                text, candidates = readSection(nodes,avoidedImages,page['url'])
+            yield 'section', title, re.sub(r'\[[^\]]*\]', '', text), candidates #get rid of square brackets
+        elif title in referenceSections:
+            with span(report, 'section.parse', title=title):
+                references = extractRefs(nodes)
+            yield 'references', title, references, []
+
+def sectionFingerprint(text):
+    # the words of a section's text, ignoring case, spacing and punctuation: the same section carried by two
+    # sources gets the same fingerprint
+    return hashlib.sha1(' '.join(re.findall(r'\w+', text.lower())).encode('utf-8')).hexdigest()
+
+def parseSections(html,report=None):
+    # parse the page once and yield its h2 sections as (title, top level nodes up to the next h2)
+    with span(report, 'page.parse', parser=htmlParser, bytes=len(html)):
+        soup = BeautifulSoup(html, htmlParser)
+
+    sections = soup.find_all('section', attrs={'data-mw-section-id': True})
+    if sections: # Parsoid HTML: each heading opens a <section>, its subsections nested inside
+        for section in sections:
+            children = [child for child in section.children if child.name]
+            heading = children[0] if children else None
+            if heading is not None and heading.name != 'h2':
+                heading = heading.find('h2', id=True) if 'mw-heading2' in (heading.get('class') or []) else None
+            if heading is not None and heading.get('id'):
+                yield heading['id'].replace('_',' '), children[1:]
+        return
+
+    for heading in soup.find_all('div', class_='mw-heading2'):
+        h2 = heading.find('h2', id=True)
+        if h2 is None:
+            continue
+        subTopicTitle = h2['id'].replace('_',' ')
+
+        nodes = []
+        for sibling in heading.next_siblings:
+            if sibling.name == 'div' and 'mw-heading2' in (sibling.get('class') or []):
+                break
+            if sibling.name:
+                nodes.append(sibling)
+        yield subTopicTitle, nodes
+
+def readSection(nodes,avoidedImages,pageUrl='https://en.wikipedia.org'):
+    # single walk over a section collecting paragraph text and image candidates with captions
+    visibleText = []
+    candidates = []
+    awaitingCaption = [] # candidates whose caption is the next figcaption along, as find_next would give
+
+    for node in nodes:
+        for element in [node, *node.descendants]:
+            if not element.name:
+                continue
+            if element.name == 'p':
+                paragraph = element.get_text().strip()
+                if paragraph:
+                    visibleText.append(paragraph)
+            elif element.name == 'figcaption' or 'thumbcaption' in (element.get('class') or []):
+                cap = element.get_text(separator=' ', strip=True)
+                for candidate in awaitingCaption:
+                    candidate[1] = cap
+                awaitingCaption = []
+            elif element.name == 'img':
+                link = imageLink(element,avoidedImages,pageUrl)
+                if not link:
+                    continue
+
+                # caption heuristics
+                cap = ""
+                parentFig = element.find_parent('figure')
+                if parentFig:
+                    capTag = parentFig.find('figcaption') or parentFig.find(class_='thumbcaption')
+                    if capTag:
+                        cap = capTag.get_text(separator=' ', strip=True)
+                candidate = [link, cap, element.get('alt') or element.get('title') or ""]
+                if not cap:
+                    awaitingCaption.append(candidate)
+                candidates.append(candidate)
+
+    return '\n\n'.join(visibleText), [(link, cap or fallback) for link, cap, fallback in candidates]
+
+def imageLink(img,avoidedImages,pageUrl='https://en.wikipedia.org'):
+    src = img.get('src') or img.get('data-src') or img.get('data-image-src') or img.get('srcset') or ''
+    if not src:
+        return None
+
+    if ',' in src and ' ' in src:
+        srcs = [s.strip() for s in src.split(',') if s.strip()]
+        last = srcs[-1]
+        src = last.split()[0]
+
+    if src.startswith('//'):
+        link = 'https:' + src
+    elif src.startswith('/'):
+        link = urljoin(pageUrl, src) # relative to the page's own wiki
+    elif src.startswith('http'):
+        link = src
+    else:
+        return None
+
+    if '/media/math/render/' in link: #skipping maths svgs as cant be saved as png
+        return None
+
+    # basic filename and filter check
+    url_path = link.split('?', 1)[0]
+    filename_only = os.path.basename(url_path)
+    if any(bad in filename_only for bad in avoidedImages):
+        return None
+
+    return link
+
+def niceRefs(nodes):
+    maxRefs = 8
+    references = []
+
+    for li in (li for node in nodes for li in node.select('ol.references > li, .reflist li')):
+        raw = (li.find('cite').get_text(" ", strip=True) if li.find('cite') else li.get_text(" ", strip=True))
+        raw = re.sub(r'^\s*(?:[\^↑]|[\^↑]?\s*[a-z]\b(?:\s+[a-z]\b)*\s*)+', '', raw, flags=re.I)
+        text = re.sub(r'\s+', ' ', raw).strip()[:300]
+
+        url = None
+        for a in li.find_all('a', href=True):
+            href = a['href']
+            if href.startswith('http://') or href.startswith('https://'):
+                url = href
+                break
+
+        references.append((text, url))
+        if len(references) == maxRefs:
+            break
+
+    return references
+
+def extractRefs(nodes):
+    refs = ''
+    for i, (text, url) in enumerate(niceRefs(nodes), start=1):
+        if url:
+            refs+=f"{i}. {text}\n   → {url}\n"
+        else:
+            refs+=f"{i}. {text}\n"
+
+    return refs
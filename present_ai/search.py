@@ -0,0 +1,41 @@
+# Interactive topic search
+
+def searchWikipedia(language='en'):
+    import wikipedia # slow to import, and only needed here
+    wikipedia.set_lang(language)
+
+    topicChosen = False
+
+    while not topicChosen:
+        topic = input("Enter a topic for your PowerPoint: ")
+        try:
+            results = wikipedia.search(topic, results=5)
+            
+            if not results:
+                print(f"\nTopic not found!")
+                return
+
+            print(f"\n--- Select from the following! ---")
+            
+            for i, title in enumerate(results):
+                print(f"[{i+1}] {title}")
+            
+            print("-------------------------------------------------")
+
+            try:
+                choice = int(input('Enter topic number - '))
+                topicChosen = True
+                topic = results[choice-1]
+            except Exception as e:
+                print(f"\nAn unexpected error occurred: {e}")
+
+        except wikipedia.exceptions.DisambiguationError:
+            print(f"\nThe topic '{topic}' is too general. Please be more specific.")
+
+        except Exception as e:
+            print(f"\nAn unexpected error occurred: {e}")
+
+    parentFolder = topic.replace(' ','_')
+    url = f"https://{language}.wikipedia.org/wiki/"+parentFolder
+
+    return url, topic, parentFolder
@@ -0,0 +1,217 @@
+# A resident deck service: HTTP job queue with progress streaming
+
+import asyncio
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import quote, urlsplit
+
+from .config import keepDecks, keepJobs, maxRequestBody
+from .fetchers import deckName, sourcesFromLine
+from .report import RunReport
+from .scheduler import llmScheduler
+
+class JobReport(RunReport):
+    # a run report that also hands each finished stage to a callback, which is how a job streams its progress
+
+    def __init__(self, onEvent):
+        super().__init__()
+        self.onEvent = onEvent
+
+    @contextmanager
+    def span(self, stage, **args):
+        start = time.perf_counter()
+        with super().span(stage, **args) as info:
+            yield info
+        event = {'stage': stage, 'ms': round((time.perf_counter()-start)*1000)}
+        event.update((field, info[field]) for field in ('title', 'source', 'bytes') if field in info)
+        self.onEvent(event)
+
+class DeckService:
+    # a resident deck builder: jobs arrive over HTTP, wait in a bounded queue and are built by a fixed number of
+    # workers that share one warm DeckBuilder (HTTP pools, OpenAI client, caches and image store)
+
+    def __init__(self, builder, workers=4, maxQueued=100, language=None):
+        self.builder = builder
+        self.workers = workers
+        self.language = language # edition bare topic names are looked up in
+        self.queue = asyncio.Queue(maxQueued)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.jobs = {}
+        self.active = {} # deck name -> job queued or building it, so the same deck isn't built twice at once
+        self.nextId = 1
+        self.changed = asyncio.Condition()
+        self.started = time.time()
+        self.loop = None
+
+    def submit(self, line, language=None):
+        # returns (job, whether it is new); raises asyncio.QueueFull when the queue is at its limit
+        pageUrl, topic = sourcesFromLine(line, language or self.language)
+        name = deckName(pageUrl, topic)
+        if name in self.active:
+            return self.active[name], False
+
+        job = {'id': f'{self.nextId:06d}', 'input': line, 'topic': topic, 'name': name, 'url': pageUrl, 'state': 'queued',
+               'submitted': time.time(), 'events': []}
+        self.queue.put_nowait(job)
+        self.nextId += 1
+        self.jobs[job['id']] = job
+        self.active[name] = job
+        for jobId in [jobId for jobId, old in self.jobs.items() if old['state'] in ('done', 'failed')][:max(0, len(self.jobs)-keepJobs)]:
+            del self.jobs[jobId]
+        return job, True
+
+    async def work(self):
+        while True:
+            job = await self.queue.get()
+            job['state'] = 'running'
+            await self.publish(job, {'state': 'running'})
+            report = JobReport(lambda event: self.record(job, event))
+            start = time.time()
+            deck = io.BytesIO() # decks are built and served from memory, the disk only sees kept artifacts
+            try:
+                result = await self.loop.run_in_executor(self.pool, self.builder.build, job['url'], job['topic'], report, deck)
+                if isinstance(result, str):
+                    job['path'] = result
+                job['deck'] = deck.getvalue()
+                job['bytes'] = len(job['deck'])
+                job['state'] = 'done'
+            except Exception as e:
+                job['error'] = f"{type(e).__name__}: {e}"
+                job['state'] = 'failed'
+            job['seconds'] = round(time.time()-start, 2)
+            job['stages'] = report.stages()
+            del self.active[job['name']]
+            print(f"[{job['id']}] {job['topic']}: {job['state']} in {job['seconds']}s", flush=True)
+            await self.publish(job, {key: job[key] for key in ('state', 'path', 'bytes', 'error', 'seconds') if key in job})
+            self.dropOldDecks()
+            self.queue.task_done()
+
+    def dropOldDecks(self):
+        # only the newest keepDecks finished decks stay downloadable, so memory use stays bounded
+        held = [job for job in self.jobs.values() if 'deck' in job]
+        for job in held[:max(0, len(held)-keepDecks)]:
+            del job['deck']
+
+    def record(self, job, event):
+        # called on the build threads
+        asyncio.run_coroutine_threadsafe(self.publish(job, event), self.loop)
+
+    async def publish(self, job, event):
+        job['events'].append(event)
+        async with self.changed:
+            self.changed.notify_all()
+
+    async def follow(self, job):
+        # the job's events so far, then each new one as it happens, until the job has finished
+        sent = 0
+        while True:
+            while sent < len(job['events']):
+                yield job['events'][sent]
+                sent += 1
+            if job['state'] in ('done', 'failed'):
+                return
+            async with self.changed:
+                await self.changed.wait_for(lambda: len(job['events']) > sent)
+
+    def summary(self, job):
+        return {key: value for key, value in job.items() if key not in ('events', 'deck')}
+
+    def health(self):
+        states = [job['state'] for job in self.jobs.values()]
+        health = {'workers': self.workers, 'uptime': round(time.time()-self.started), 'queued': self.queue.qsize(),
+                  **{state: states.count(state) for state in ('running', 'done', 'failed')}}
+        health['llm'] = llmScheduler().stats()
+        for name, cache in (('completions', self.builder.summariser.cache), ('images', self.builder.assets),
+                            ('pages', getattr(self.builder.fetcher, 'cache', None))):
+            if cache is not None:
+                health[name] = cache.stats()
+        return health
+
+    async def handle(self, reader, writer):
+        # just enough HTTP/1.1 for the routes below: one request per connection
+        try:
+            requestLine = (await reader.readline()).decode('latin-1').split()
+            if len(requestLine) < 2:
+                return
+            method, target = requestLine[0].upper(), urlsplit(requestLine[1]).path.rstrip('/')
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length') or 0)
+            if length > maxRequestBody: # a job is a topic or a short JSON object, never worth buffering more
+                return await reply(writer, 413, {'error': f'request body over {maxRequestBody} bytes'})
+            body = await reader.readexactly(length)
+            await self.route(method, target.split('/')[1:], body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, parts, body, writer):
+        job = self.jobs.get(parts[1]) if len(parts) > 1 and parts[0] == 'jobs' else None
+
+        if method == 'POST' and parts == ['jobs']:
+            try:
+                request = json.loads(body) if body.lstrip().startswith(b'{') else {'topic': body.decode('utf-8')}
+                sources = request.get('sources') or [request.get('url') or request.get('topic') or '']
+                line = ' | '.join(source.strip() for source in sources if source.strip())
+            except (ValueError, AttributeError):
+                line = ''
+            if not line:
+                return await reply(writer, 400, {'error': "send {'topic': ...}, {'url': ...} or {'sources': [...]}"})
+            try:
+                job, new = self.submit(line, request.get('language'))
+            except asyncio.QueueFull:
+                return await reply(writer, 503, {'error': f'queue is full ({self.queue.maxsize} jobs)'})
+            return await reply(writer, 202 if new else 200, self.summary(job))
+        if method == 'GET' and parts == ['jobs']:
+            return await reply(writer, 200, [self.summary(job) for job in self.jobs.values()])
+        if method == 'GET' and parts == ['health']:
+            return await reply(writer, 200, self.health())
+        if method != 'GET' or job is None or len(parts) > 3:
+            return await reply(writer, 404, {'error': 'not found'})
+
+        if len(parts) == 2:
+            return await reply(writer, 200, self.summary(job))
+        if parts[2] == 'events': # newline-delimited JSON until the job finishes
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n')
+            async for event in self.follow(job):
+                writer.write(json.dumps(event, default=str).encode('utf-8') + b'\n')
+                await writer.drain()
+            return
+        if parts[2] == 'deck':
+            if job['state'] != 'done':
+                return await reply(writer, 409, {'error': f"job is {job['state']}", **self.summary(job)})
+            if 'deck' not in job:
+                return await reply(writer, 410, {'error': f'deck dropped, only the last {keepDecks} are kept', **self.summary(job)})
+            return await reply(writer, 200, job['deck'], 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+                               {'Content-Disposition': f'attachment; filename="{quote(job["name"])} Powerpoint.pptx"'})
+        return await reply(writer, 404, {'error': 'not found'})
+
+    async def serve(self, host, port):
+        self.loop = asyncio.get_running_loop()
+        workers = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving decks on http://{host}:{port} with {self.workers} workers (POST /jobs, GET /jobs/<id>[/events|/deck])", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+async def reply(writer, status, body, contentType='application/json', extraHeaders=None):
+    data = body if isinstance(body, bytes) else json.dumps(body, default=str).encode('utf-8')
+    reasons = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 409: 'Conflict', 410: 'Gone', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+    head = [f'HTTP/1.1 {status} {reasons.get(status, "")}', f'Content-Type: {contentType}', f'Content-Length: {len(data)}', 'Connection: close']
+    head += [f'{name}: {value}' for name, value in (extraHeaders or {}).items()]
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data)
+    await writer.drain()
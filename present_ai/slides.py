@@ -0,0 +1,93 @@
+# Drawing slides with python-pptx
+
+import io
+import shutil
+
+from pptx.enum.text import PP_ALIGN
+from pptx.util import Inches, Pt
+
+def addTitleSlide(presentation,topic):
+    slide = presentation.slides.add_slide(presentation.slide_layouts[0]) #title layout
+    title = slide.shapes.title
+    subtitle = slide.placeholders[1]
+
+    title.text = str(topic)
+    return subtitle
+
+def setSubtitle(subtitle,subTopicTitles):
+    #adding first few subtopics as title page subtitle, once every section is known
+    if len(subTopicTitles) > 3:
+        subtitleText = '{}, {}, {} and more'.format(*subTopicTitles[:3])
+    else:
+        subtitleText = ', '.join(subTopicTitles)
+
+    subtitle.text = subtitleText
+
+def renderSlide(presentation,layout):
+    # draws one slide from its layout: the geometry is all decided already, so this is a straight copy into pptx
+    slide = presentation.slides.add_slide(presentation.slide_layouts[1]) #title and content layout
+    slide.notes_slide.notes_text_frame.text = layout['notes'] #speaker notes
+    slide.shapes.title.text = layout['title']
+
+    body = slide.placeholders[1] # moved and resized to the text box rather than swapped for another layout's
+    body.left, body.top, body.width, body.height = (Inches(value) for value in layout['textBox'])
+    body.text = '\n'.join(layout['bullets'])
+    for paragraph in body.text_frame.paragraphs:
+        paragraph.font.size = Pt(layout['fontSize'])
+
+    for picture in layout['pictures']:
+        image = io.BytesIO(picture['image']) if isinstance(picture['image'], bytes) else picture['image']
+        slide.shapes.add_picture(image, *(Inches(value) for value in picture['box']))
+
+    for caption in layout['captions']:
+        text_frame = slide.shapes.add_textbox(*(Inches(value) for value in caption['box'])).text_frame
+        text_frame.word_wrap = True
+        text_frame.text = caption['text']
+        for paragraph in text_frame.paragraphs:
+            paragraph.alignment = PP_ALIGN.CENTER
+            paragraph.font.size = Pt(caption['fontSize'])
+            paragraph.font.italic = True
+
+def addRefsSlide(presentation,referencesContent,url):
+    slide_layout = presentation.slide_layouts[1]
+    slide = presentation.slides.add_slide(slide_layout)
+    title = slide.shapes.title
+    title.text = 'References'
+
+    body = slide.placeholders[1]  # main body placeholder
+    tf = body.text_frame
+    tf.clear()
+
+    urls = [url] if isinstance(url, str) else url # multi-source decks list every source, the main one first
+    for i, source in enumerate(urls):
+        p = tf.paragraphs[0] if i == 0 else tf.add_paragraph()
+        p.level = 0
+        run1 = p.add_run()
+        run1.text = "Main source: " if i == 0 else "Also from: "
+        run2 = p.add_run()
+        run2.text = source
+        run2.hyperlink.address = source
+        run1.font.size = Pt(20 if i == 0 else 16)
+        run2.font.size = Pt(20 if i == 0 else 16)
+
+    p = tf.add_paragraph()
+    p.level = 0
+    p.text = referencesContent
+    p.font.size = Pt(12)
+
+def saveDeck(presentation,output):
+    # writes the deck to a binary stream and returns its size. Seekable ones (files, io.BytesIO) are written in
+    # place; pipes, stdout and upload sinks get it from memory, so the zip keeps ordinary local headers
+    if getattr(output, 'seekable', lambda: False)():
+        start = output.tell()
+        presentation.save(output)
+        return output.tell() - start
+    buffer = io.BytesIO()
+    presentation.save(buffer)
+    output.write(buffer.getbuffer())
+    return buffer.tell()
+
+def copyDeck(path,output):
+    # an already saved deck, streamed to output
+    with open(path, 'rb') as f:
+        shutil.copyfileobj(f, output)
@@ -0,0 +1,72 @@
+# SQLite stores kept under a size cap: the completion cache, the page cache and the image store's index
+
+import os
+import sqlite3
+import threading
+
+class SqliteStore:
+    # a SQLite file shared by threads and processes (WAL) whose main table has a key, a size and a last used
+    # time per row, kept under maxBytes by evicting the least recently used rows. The size is a running total,
+    # so adding a row only scans the table when the total goes over the cap or every evictEvery adds (to expire
+    # old rows and pick up what other processes added). Eviction goes down to lowWater of the cap, so a full
+    # store isn't scanned again on the very next add
+    table = None
+    keyColumn = None
+    evictEvery = 256
+    lowWater = 0.9
+
+    def __init__(self, path, maxBytes, schema):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.maxBytes = maxBytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        for statement in schema:
+            self.db.execute(statement)
+        self.db.commit()
+        self.total = self.size()
+        self.adds = 0
+
+    def size(self):
+        return self.db.execute(f'SELECT COALESCE(SUM(size), 0) FROM {self.table}').fetchone()[0]
+
+    def added(self, size, now, keep=None):
+        # callers hold the lock and commit after: a row of size bytes was just written. keep is never evicted
+        self.total += size
+        self.adds += 1
+        if self.total > self.maxBytes or self.adds % self.evictEvery == 0:
+            self.evict(now, keep)
+
+    def evict(self, now, keep=None):
+        self.expire(now)
+        self.total = self.size()
+        if self.total <= self.maxBytes:
+            return
+        target = self.maxBytes * self.lowWater
+        while self.total > target:
+            rows = self.db.execute(
+                f'SELECT {self.keyColumn}, size FROM {self.table} WHERE {self.keyColumn} IS NOT ? ORDER BY used LIMIT 256', (keep,)
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self.remove(key)
+                self.total -= size
+                if self.total <= target:
+                    break
+
+    def expire(self, now):
+        # stores whose rows only last so long delete the old ones here
+        pass
+
+    def remove(self, key):
+        self.db.execute(f'DELETE FROM {self.table} WHERE {self.keyColumn} = ?', (key,))
+
+def storeLocation(variable, name):
+    # where a store lives: the variable's path, or name in ~/.cache/present-ai when it is unset. None when the
+    # variable turns the store off
+    location = os.environ.get(variable, os.path.join(os.path.expanduser('~'), '.cache', 'present-ai', name))
+    return None if location.lower() in ('', 'off', 'none', '0') else location
+
+def storeMegabytes(variable, default):
+    return int(float(os.environ.get(variable, default)) * 1024 * 1024)
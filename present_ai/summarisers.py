@@ -0,0 +1,224 @@
+# Summarisation backends: the OpenAI agents, or an offline extractive summariser
+
+import copy
+import os
+import re
+import threading
+
+from .agents import chunkText, makeBulletPoints, mergeBulletPoints, summariseCaption
+from .cache import openCompletionCache
+from .config import chunkTokens, deckCostCap, stopWords, summarisers, unspacedLanguages
+from .report import span
+from .scheduler import BudgetExceeded, DeckBudget
+
+class Summariser:
+    # what the pipeline needs from a summarisation backend. chunkTokens is the input budget per
+    # bulletPoints call (None when a backend takes whole sections at once)
+    chunkTokens = None
+    cache = None
+
+    def bulletPoints(self, text, report=None):
+        raise NotImplementedError
+
+    def mergeBulletPoints(self, bulletText, report=None):
+        raise NotImplementedError
+
+    def caption(self, captionText, report=None):
+        raise NotImplementedError
+
+    def forDeck(self, language=None):
+        # the summariser one deck's build uses, for backends that keep per-deck state. language is the
+        # Wikipedia edition the deck comes from
+        return self
+
+class OpenAISummariser(Summariser):
+    # the OpenAI agents above, with their client and completion cache. The client (and openai itself) is only
+    # made once a request misses the cache, so up-to-date and cache-only rebuilds need no API key. A deck's
+    # copy (forDeck) shares it, carries that deck's cost budget and falls back to the local summariser, slide
+    # by slide, as the budget runs out or when the API still refuses after every retry
+
+    def __init__(self, ai=None, cache=None, costCap=None):
+        self.client = ai
+        self.clientLock = threading.Lock()
+        self.owner = self # deck copies use the client of the summariser they were made from
+        self.cache = cache if cache is not None else openCompletionCache()
+        self.chunkTokens = chunkTokens
+        self.costCap = deckCostCap if costCap is None else costCap
+        self.budget = None
+        self.language = None
+        self.local = None
+
+    def openClient(self):
+        owner = self.owner
+        with owner.clientLock:
+            if owner.client is None:
+                from openai import OpenAI
+                owner.client = OpenAI(api_key=os.environ["OPENAI_API_KEY"], max_retries=0) # retries handled by callAI
+        return owner.client
+
+    ai = property(openClient)
+
+    def forDeck(self, language=None):
+        deck = copy.copy(self) # same client and cache, its own budget and fallback
+        deck.budget = DeckBudget(self.costCap) if self.costCap else None
+        deck.language = language
+        deck.local = None
+        return deck
+
+    def bulletPoints(self, text, report=None):
+        if self.budget is not None and self.budget.used() >= DeckBudget.shortInputsAt:
+            text = (chunkText(text, self.chunkTokens//3) or [text])[0] # the section's opening part only
+        try:
+            return makeBulletPoints(text, self.openClient, self.cache, report, self.budget)
+        except Exception as e:
+            return self.fallback(e).bulletPoints(text, report)
+
+    def mergeBulletPoints(self, bulletText, report=None):
+        try:
+            return mergeBulletPoints(bulletText, self.openClient, self.cache, report, self.budget)
+        except Exception as e:
+            return self.fallback(e).mergeBulletPoints(bulletText, report)
+
+    def caption(self, captionText, report=None):
+        if self.budget is not None and self.budget.used() >= DeckBudget.captionsOffAt:
+            return self.fallback().caption(captionText, report)
+        try:
+            return summariseCaption(captionText, self.openClient, self.cache, report, self.budget)
+        except Exception as e:
+            return self.fallback(e).caption(captionText, report)
+
+    def fallback(self, error=None):
+        # the local summariser, standing in when the budget is spent or rate limiting outlasts the retries
+        if error is not None and not isinstance(error, BudgetExceeded):
+            from openai import RateLimitError
+            if not isinstance(error, RateLimitError):
+                raise error
+        if self.local is None:
+            self.local = LocalSummariser(language=self.language or 'en')
+        return self.local
+
+class LocalSummariser(Summariser):
+    # extractive backend with no network or API cost: sentences are ranked with TextRank over TF-IDF
+    # vectors and the best ones, in their original order, become the bullets. Works in any language; the
+    # stop words are only left out of English text, elsewhere IDF alone weighs common words down
+
+    def __init__(self, minBullets=4, maxBullets=8, maxWords=18, language='en'):
+        self.minBullets = minBullets
+        self.maxBullets = maxBullets
+        self.maxWords = maxWords
+        self.language = language
+
+    def forDeck(self, language=None):
+        if language is None or language == self.language:
+            return self
+        deck = copy.copy(self)
+        deck.language = language
+        return deck
+
+    def bulletPoints(self, text, report=None):
+        with span(report, 'local.bullets', chars=len(text)):
+            sentences = [sentence for sentence in splitSentences(text) if self.wordCount(sentence) >= 4]
+            return self.pickSentences(sentences)
+
+    def mergeBulletPoints(self, bulletText, report=None):
+        with span(report, 'local.merge', chars=len(bulletText)):
+            return self.pickSentences([line.strip() for line in bulletText.split('\n') if line.strip()])
+
+    def caption(self, captionText, report=None):
+        if not captionText:
+            return ""
+        firstClause = re.split(r'[.;:(。；：（]|\s[-–—]\s', captionText, maxsplit=1)[0]
+        return self.shorten(firstClause.strip() or captionText, 8)
+
+    @property
+    def np(self):
+        import numpy # only ranking sentences needs NumPy, captions don't
+        return numpy
+
+    def pickSentences(self, sentences):
+        if not sentences:
+            return ""
+        count = min(len(sentences), self.maxBullets, max(self.minBullets, len(sentences)//6))
+        scores = self.textRank(sentences)
+        chosen = sorted(self.np.argsort(-scores, kind='stable')[:count])
+        return '\n'.join(self.shorten(sentences[i], self.maxWords) for i in chosen)
+
+    def textRank(self, sentences):
+        np = self.np
+        stops = stopWords if self.language == 'en' else ()
+        tokens = [[word for word in self.words(sentence) if word not in stops] for sentence in sentences]
+        vocabulary = {}
+        for words in tokens:
+            for word in words:
+                vocabulary.setdefault(word, len(vocabulary))
+        n = len(sentences)
+        if n == 1 or not vocabulary:
+            return np.ones(n)
+
+        counts = np.zeros((n, len(vocabulary)))
+        for i, words in enumerate(tokens):
+            for word in words:
+                counts[i, vocabulary[word]] += 1
+        idf = np.log((1 + n) / (1 + (counts > 0).sum(axis=0))) + 1
+        vectors = counts * idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+
+        similarity = vectors @ vectors.T
+        np.fill_diagonal(similarity, 0)
+        rowSums = similarity.sum(axis=1, keepdims=True)
+        transition = similarity / np.where(rowSums == 0, 1, rowSums)
+
+        scores = np.full(n, 1/n)
+        for _ in range(100): # power iteration, damping 0.85 as in PageRank
+            updated = 0.15/n + 0.85 * (transition.T @ scores)
+            if np.abs(updated - scores).sum() < 1e-8:
+                break
+            scores = updated
+        return scores
+
+    def words(self, sentence):
+        # the terms sentences are compared by: words, or character pairs in text written without spaces
+        words = re.findall(r"\w+(?:'\w+)*", sentence.lower())
+        if self.language in unspacedLanguages:
+            return [word[i:i+2] for word in words for i in range(max(1, len(word)-1))]
+        return words
+
+    def wordCount(self, text):
+        # about two characters make a word in text written without spaces
+        return len(text)//2 if self.language in unspacedLanguages else len(text.split())
+
+    def shorten(self, sentence, maxWords):
+        if self.language in unspacedLanguages:
+            sentence = sentence.rstrip('.。')
+            return sentence if len(sentence) <= 2*maxWords else sentence[:2*maxWords] + '...'
+        words = sentence.rstrip('.').split()
+        if len(words) <= maxWords:
+            return ' '.join(words)
+        return ' '.join(words[:maxWords]).rstrip(',;:') + '...'
+
+def splitSentences(text):
+    # a sentence ends at a line break, at '.', '!' or '?' followed by a capital (in any script), digit, quote
+    # or bracket, or at a full-width '。', '！' or '？'
+    sentences = []
+    for line in text.split('\n'):
+        first = len(sentences)
+        for piece in re.split(r'(?<=[.!?])\s+|(?<=[。！？])', line):
+            piece = piece.strip()
+            if not piece:
+                continue
+            if len(sentences) > first and not sentences[-1].endswith(('。', '！', '？')) and not startsSentence(piece):
+                sentences[-1] += ' ' + piece
+            else:
+                sentences.append(piece)
+    return sentences
+
+def startsSentence(piece):
+    return piece[0].isupper() or piece[0].isdigit() or piece[0] in '"\'(«„“‘¿¡'
+
+def makeSummariser(name, **kwargs):
+    if name == 'local':
+        return LocalSummariser()
+    if name == 'openai':
+        return OpenAISummariser(**kwargs)
+    raise ValueError(f"Unknown summariser '{name}', expected one of: {', '.join(summarisers)}")